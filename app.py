@@ -2,31 +2,68 @@
 from flask import Flask, request, Response, jsonify
 from flask_cors import CORS
 import json
-from app.chatbot import chat_wrapper, save_history, load_history
+from app.chatbot import (chat_stream, save_history, clear_history, history_page,
+                         history_query, save_data, warmup)
+from app import metrics
 
 app = Flask(__name__)
 CORS(app)  # allow frontend to connect from browser
 
 @app.route("/chat", methods=["POST"])
 def chat():
-    data = request.get_json()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get("session_id"):
+        return jsonify({"error": "session_id is required"}), 400
     message = data.get("message", "")
     history = data.get("history", [])
+    session_id = data["session_id"]
 
     def stream():
-        for chunk in chat_wrapper(message, history):
-            yield f"data: {json.dumps(chunk)}\n\n"  # SSE format
+        for event in chat_stream(message, history, session_id):
+            yield f"data: {json.dumps(event)}\n\n"  # SSE format: one delta per frame
 
     return Response(stream(), content_type="text/event-stream")
 
-@app.route("/history", methods=["GET", "POST"])
+@app.route("/history", methods=["GET", "POST", "DELETE"])
 def manage_history():
     if request.method == "GET":
-        return jsonify(load_history())
+        # ?session_id=...&cursor=...&limit=...  -> {"messages": [...], "next_cursor": ...}
+        try:
+            session_id, cursor, limit = history_query(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(history_page(session_id, cursor=cursor, limit=limit))
+    elif request.method == "DELETE":
+        # ?session_id=...  -> clears the session
+        if not request.args.get("session_id"):
+            return jsonify({"error": "session_id is required"}), 400
+        clear_history(request.args["session_id"])
+        return jsonify({"status": "cleared"})
     elif request.method == "POST":
-        history = request.get_json()
-        save_history(history)
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or not body.get("session_id"):
+            return jsonify({"error": "session_id is required"}), 400
+        save_history(body.get("history", []), body["session_id"])
         return jsonify({"status": "saved"})
 
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=7860, debug=True)
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--asgi", action="store_true",
+                        help="serve with uvicorn (async, cancels on disconnect)")
+    args = parser.parse_args()
+
+    if args.asgi:
+        import uvicorn
+        uvicorn.run("app.server:app", host="0.0.0.0", port=7860)
+    else:
+        import sys, atexit, signal
+        atexit.register(save_data)      # persist FAQ cache, question log and index
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))   # run atexit on `kill` too
+        warmup()
+        # the reloader would load the models a second time in its child process
+        app.run(host="0.0.0.0", port=7860, debug=True, use_reloader=False)
@@ -1,47 +1,111 @@
-import sys, os, json, time, pathlib
-from collections import OrderedDict
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+import sys, os, time, pathlib
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from app.retrieval import query_vector_store
-from app.config    import VECTOR_COLLECTION
-from app.llm       import get_engine
+from app.retrieval import search
+from app.config    import (VECTOR_COLLECTION, CACHE_CONTEXT_PREFIX,
+                           STREAM_WINDOW_MS, STREAM_MAX_CHARS, HISTORY_TTL_DAYS,
+                           MAX_ANSWER_TOKENS, CONTEXT_MAX_TOKENS, SUMMARY_MAX_TOKENS,
+                           FAQ_QUANTIZATION, CACHE_POLICY, CACHE_TTL_HOURS)
+from app           import resources, metrics
+from app.faq_index import FaqIndex
+from app.storage   import Journal
+from app.prompts   import PROMPT_PREFIX, SUMMARY_PROMPT
+from app.streaming import coalesce
+from app.context   import pack_context
+from app.memory    import ConversationMemory
+from app.history   import HistoryStore
+from app.response_cache import ResponseCache, cache_key
 
 os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
 os.environ["TF_CPP_MIN_LOG_LEVEL"]  = "2"
 
-engine   = get_engine()                        # loads GGUF once
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-
 DATA_DIR           = pathlib.Path("data")
 DATA_DIR.mkdir(exist_ok=True)
 
 CACHE_FILE         = DATA_DIR / "faq_cache.json"
+FAQ_INDEX_FILE     = DATA_DIR / "faq_cache.npz"       # embeddings of cache keys
 QUESTION_LOG_FILE  = DATA_DIR / "questions_log.json"
+HISTORY_FILE       = pathlib.Path(__file__).resolve().parents[1] / "data" / "chat_history.json"
+HISTORY_DB         = HISTORY_FILE.with_suffix(".sqlite3")
 CACHE_LIMIT        = 1_000
-
-def _load_json(path, default):
-    try:
-        txt = path.read_text(encoding="utf-8")
-        return json.loads(txt) if txt.strip() else default
-    except (FileNotFoundError, json.JSONDecodeError):
-        return default
-
-response_cache = OrderedDict(_load_json(CACHE_FILE, {}))
-question_log   = _load_json(QUESTION_LOG_FILE, [])
-
-def semantic_faq_match(user_input: str):
-    if not response_cache:
-        return None
-    user_emb        = embedder.encode([user_input])[0]
-    questions       = list(response_cache.keys())
-    question_embeds = embedder.encode(questions)
-    sims            = cosine_similarity([user_emb], question_embeds)[0]
-    best_idx        = sims.argmax()
-    if sims[best_idx] >= 0.85:
-        return response_cache[questions[best_idx]]["answer"]
-    return None
+FAQ_THRESHOLD      = 0.85
+FALLBACK_CONTEXT   = (
+    "NileEdge Innovations is a technology company based in Ghana, offering services in AI, data science, automation, and medical AI. "
+    "Visit https://www.nileedgeinnovations.org to learn more or contact our team."
+)
+
+cache_journal  = Journal(CACHE_FILE, "dict")
+log_journal    = Journal(QUESTION_LOG_FILE, "list")
+
+response_cache = ResponseCache(cache_journal, CACHE_LIMIT, FAQ_THRESHOLD,
+                               policy=CACHE_POLICY, ttl_hours=CACHE_TTL_HOURS)
+question_log   = log_journal.load()
+history_store  = HistoryStore(HISTORY_DB, ttl_days=HISTORY_TTL_DAYS,
+                              legacy_json=HISTORY_FILE)
+
+
+def _load_faq_index():
+    embedder = resources.get("embedder")
+    return FaqIndex.load(FAQ_INDEX_FILE, list(response_cache),
+                         embedder.encode, dim=embedder.dim, quantization=FAQ_QUANTIZATION)
+
+resources.register("faq_index", _load_faq_index)
+
+def warmup():
+    """Load the models and indexes now rather than on the first request."""
+    timings = resources.warmup()
+    print(f"Warmed up: {timings}")
+    return timings
+
+
+@metrics.collector
+def _engine_metrics():
+    """Engine pool gauges for /metrics; nothing until the engine is loaded."""
+    if not resources.loaded("engine") or not hasattr(resources.get("engine"), "stats"):
+        return []
+    stats   = resources.get("engine").stats()
+    samples = [
+        ("chatbot_engine_workers", "gauge", {}, stats["workers"]),
+        ("chatbot_engine_busy",    "gauge", {}, stats["busy"]),
+        ("chatbot_engine_queued",  "gauge", {"priority": "live"}, stats["queued"]),
+        ("chatbot_engine_queued",  "gauge", {"priority": "background"}, stats["queued_background"]),
+    ]
+    for name, key in (("chatbot_engine_queue_wait_seconds", "queue_wait_ms"),
+                      ("chatbot_engine_ttft_seconds", "ttft_ms")):
+        for q, quantile in (("p50", "0.5"), ("p95", "0.95"), ("max", "1")):
+            if stats[key][q] is not None:
+                samples.append((name, "gauge", {"quantile": quantile}, stats[key][q] / 1000))
+    spec = stats.get("speculative")
+    if spec:
+        for kind in ("proposed", "verified", "accepted"):
+            samples.append(("chatbot_speculative_tokens_total", "counter", {"kind": kind}, spec[kind]))
+        if spec["acceptance_rate"] is not None:
+            samples.append(("chatbot_speculative_acceptance_ratio", "gauge", {}, spec["acceptance_rate"]))
+    cache = stats.get("prefix_cache")
+    if cache:
+        samples.append(("chatbot_prefix_cache_total", "counter", {"result": "hit"}, cache["hits"]))
+        samples.append(("chatbot_prefix_cache_total", "counter", {"result": "miss"}, cache["misses"]))
+    return samples
+
+def _summarize(summary, question, answer):
+    prompt = SUMMARY_PROMPT.format(summary=summary or "(none)", question=question, answer=answer)
+    engine = resources.get("engine")
+    # low priority: a summary never holds up a live answer waiting for a worker
+    stream = getattr(engine, "stream_background", engine.stream)
+    tokens = stream(prompt, max_tokens=SUMMARY_MAX_TOKENS, stop=["\n\n", "User:"], temperature=0.0)
+    return "".join(tokens).strip()
+
+conversation_memory = ConversationMemory(_summarize)
+
+def semantic_faq_match(user_input: str, user_emb=None):
+    answer = None
+    if len(response_cache):
+        if user_emb is None:
+            user_emb = resources.get("embedder").encode_query(user_input)
+        with metrics.span("faq_match"):
+            answer = response_cache.match(user_emb)
+    metrics.inc("chatbot_cache_total", tier="semantic", result="hit" if answer else "miss")
+    return answer
 
 # def generate_response(user_input: str, history=None):
 #     """Yields tokens so the UI can stream them."""
@@ -154,85 +218,81 @@ def semantic_faq_match(user_input: str):
 
 #     save_data()
 
-def generate_response(user_input: str, history=None):
+def generate_response(user_input: str, history=None, session_id="default", log_question=True):
     """Yields tokens so the UI can stream them."""
     if not user_input.strip():
         yield "Please enter a valid question so I can assist you."
         return
 
-    key = user_input.strip().lower()
+    key = cache_key(user_input)
+
+    # 1) question log (every user question, cache hits included)
+    if log_question:
+        entry = {
+            "question": key,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        question_log.append(entry)
+        log_journal.push(entry)
+
+    # 2) exact cache hit: no embedding needed
+    answer = response_cache.lookup(key)
+    metrics.inc("chatbot_cache_total", tier="exact", result="hit" if answer else "miss")
+    if answer:
+        yield answer
+        return
 
-    # 1) semantic FAQ hit
-    faq_ans = semantic_faq_match(user_input)
+    # 3) semantic FAQ hit (the query embedding is reused for retrieval)
+    with metrics.span("embed"):
+        user_emb = resources.get("embedder").encode_query(user_input)
+    faq_ans  = semantic_faq_match(user_input, user_emb)
     if faq_ans:
         yield faq_ans
         return
 
-    # 2) question log
-    question_log.append({
-        "question": key,
-        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-    })
-
-    # 3) literal cache hit
-    if key in response_cache:
-        response_cache.move_to_end(key)
-        yield response_cache[key]["answer"]
-        return
-
-    # 4) RAG context + memory
+    # 4) RAG context + memory packed into what the context window has left
+    kb_version = response_cache.kb_version()           # before retrieval: what the chunks belong to
     try:
-        context_list = query_vector_store(user_input, VECTOR_COLLECTION)
-        context = "\n".join(context_list) if context_list else (
-            "NileEdge Innovations is a technology company based in Ghana, offering services in AI, data science, automation, and medical AI. "
-            "Visit https://www.nileedgeinnovations.org to learn more or contact our team."
-        )
+        with metrics.span("retrieval"):
+            hits = search(user_input, VECTOR_COLLECTION, k=10, query_embedding=user_emb)
     except Exception as e:
         print(f"Error querying vector store: {e}")
-        context = (
-            "NileEdge Innovations is a technology company based in Ghana, offering services in AI, data science, automation, and medical AI. "
-            "Visit https://www.nileedgeinnovations.org to learn more or contact our team."
-        )
-
-    memory = ""
-    if history:
-        valid_history = []
-        if isinstance(history, list):
-            user_msg = None
-            for item in history[-10:]:
-                if isinstance(item, dict) and "role" in item and "content" in item:
-                    if item["role"] == "user":
-                        user_msg = item["content"]
-                    elif item["role"] == "assistant" and item["content"].strip():
-                        if user_msg is not None:
-                            valid_history.append([user_msg, item["content"]])
-                            user_msg = None  # reset after pairing
-
-        # Use last 5 exchanges for memory
-        for q, a in valid_history[-5:]:
-            if q and a:
-                memory += f"User: {q}\nAssistant: {a}\n"
-
-    prompt = f"""
-You are a friendly, professional assistant for NileEdge Innovations, a company offering AI solutions, data science, automation, and digital transformation.
-
-Use the information in the "Context" section as your primary source. If the context is not enough, use your general knowledge and recent conversation history to assist the user, but stay polite and avoid fabricating facts about the company.
-
-Context:
-{context}
-
-{memory}User: {user_input}
+        hits = []
+
+    engine = resources.get("engine")
+    with metrics.span("prompt_build"):
+        # rolling summary of older turns + the last exchange verbatim
+        memory = conversation_memory.render(session_id, history) if isinstance(history, list) else ""
+        question = f"""{memory}User: {user_input}
 Assistant:
 """
+        fixed  = engine.count_tokens(f"{PROMPT_PREFIX}\n\n{question}")
+        budget = min(CONTEXT_MAX_TOKENS, engine.n_ctx - MAX_ANSWER_TOKENS - fixed)
+        chunks, context_tokens = pack_context(hits, budget, engine.count_tokens)
+        context = "\n".join(h["document"] for h in chunks) if chunks else FALLBACK_CONTEXT
+        if not chunks:
+            context_tokens = engine.count_tokens(context)
+
+        context_block = f"{PROMPT_PREFIX}{context}\n\n"
+        prompt = context_block + question
+        cache_prefix = [PROMPT_PREFIX, context_block] if CACHE_CONTEXT_PREFIX else [PROMPT_PREFIX]
+    print(f"Prefill: {fixed + context_tokens} tokens "
+          f"(context {context_tokens}/{budget}, {len(chunks)}/{len(hits)} chunks)")
+    metrics.observe("chatbot_prompt_tokens", fixed + context_tokens, buckets=metrics.TOKEN_BUCKETS)
 
     answer_parts = []
+    started, first = time.perf_counter(), None
     try:
         token_count = 0
         for tok in engine.stream(prompt,
-                                 max_tokens=512,
+                                 cache_prefix=cache_prefix,
+                                 max_tokens=MAX_ANSWER_TOKENS,
                                  stop=["User:", "Assistant:"],
                                  temperature=0.7,
                                  top_p=0.9):
+            if first is None:
+                first = time.perf_counter()
+                metrics.observe("chatbot_stage_seconds", first - started, stage="ttft")
             if tok:
                 answer_parts.append(tok)
                 yield tok
@@ -241,39 +301,189 @@ Assistant:
                     break
     except Exception as e:
         print(f"Error generating response: {e}")
+        metrics.inc("chatbot_fallbacks_total", reason="engine_error")
         fallback = ("I'm having trouble generating a response right now. "
                    "Please visit https://www.nileedgeinnovations.org "
                    "or contact us for assistance.")
         yield fallback
         return
+    finally:
+        if first is not None:
+            metrics.observe("chatbot_stage_seconds", time.perf_counter() - first, stage="decode")
+        metrics.inc("chatbot_tokens_generated_total", len(answer_parts))
 
     answer = "".join(answer_parts).strip()
 
     if not answer or len(answer.split()) < 3:
+        metrics.inc("chatbot_fallbacks_total", reason="empty_answer")
         fallback = ("I'm not entirely sure how to answer that. "
                     "Please visit https://www.nileedgeinnovations.org "
                     "or contact us for assistance.")
         yield fallback
         return
 
-    # Cache the response
-    response_cache[key] = {
-        "answer": answer,
-        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-    }
-    if len(response_cache) > CACHE_LIMIT:
-        del response_cache[next(iter(response_cache))]
-
-    save_data()
+    # Cache the response with the chunks it was built from (journaled off the request thread);
+    # the answer has already streamed, so a failure here must not replace it
+    try:
+        response_cache.put(key, answer, user_emb, sources=[h["id"] for h in chunks],
+                           kb_version=kb_version)
+    except Exception as e:
+        print(f"Error caching response: {e}")
 
 
 def save_data():
+    """Flush pending journal records and compact them into the JSON files."""
+    try:
+        cache_journal.flush(compact=True)
+        log_journal.flush(compact=True)
+        if resources.loaded("faq_index"):
+            resources.get("faq_index").save(FAQ_INDEX_FILE)
+    except Exception as e:
+        print(f"Error saving data: {e}")
+
+
+# ─────────────────────────────────────────────
+# chat history + streaming chat wrapper
+# (shared by the Gradio UI and the HTTP servers)
+# ─────────────────────────────────────────────
+def load_history(session_id="default"):
     try:
-        CACHE_FILE.write_text(json.dumps(response_cache,
-                                         indent=2, ensure_ascii=False),
-                              encoding="utf-8")
-        QUESTION_LOG_FILE.write_text(json.dumps(question_log,
-                                                indent=2, ensure_ascii=False),
-                                     encoding="utf-8")
+        return history_store.load(session_id)
     except Exception as e:
-        print(f"Error saving data: {e}")
\ No newline at end of file
+        print(f"Error loading history: {e}")
+    return []
+
+def history_page(session_id="default", cursor=None, limit=50):
+    """One page of a session's history for the HTTP API (newest page first)."""
+    return history_store.page(session_id, cursor=cursor, limit=limit)
+
+def history_query(params):
+    """
+    (session_id, cursor, limit) from GET /history query parameters.
+    Raises ValueError, which the HTTP servers answer with a 400.
+    """
+    session_id = params.get("session_id")
+    if not session_id:
+        raise ValueError("session_id is required")
+    cursor = params.get("cursor") or None
+    if cursor is not None and not cursor.isdigit():
+        raise ValueError(f"invalid cursor: {cursor!r}")
+    try:
+        limit = int(params.get("limit", 50))
+    except ValueError:
+        raise ValueError(f"invalid limit: {params.get('limit')!r}") from None
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    return session_id, cursor, min(limit, 500)
+
+def clear_history(session_id="default"):
+    try:
+        history_store.clear(session_id)
+    except Exception as e:
+        print(f"Error clearing history: {e}")
+    return []
+
+def save_history(history, session_id="default"):
+    try:
+        # Filter out empty messages before saving
+        filtered_history = []
+        for msg in history:
+            if isinstance(msg, dict) and msg.get("content", "").strip():
+                filtered_history.append(msg)
+
+        # only messages beyond those already stored are written
+        history_store.sync(session_id, filtered_history)
+    except Exception as e:
+        print(f"Error saving history: {e}")
+        import traceback
+        traceback.print_exc()
+
+def _answer_events(message, history, session_id="default"):
+    """
+    Append the user turn and an assistant placeholder to *history*, then
+    yield ("start", ""), coalesced ("delta", text) frames and, on errors or
+    an empty answer, ("replace", text).  Appends the turn's question and
+    answer to the session's stored history when done.
+    """
+    print(f"Starting chat_wrapper with history length: {len(history)}")  # Debug
+
+    # Add user message
+    history.append({"role": "user", "content": message.strip()})
+
+    # Initialize assistant message
+    history.append({"role": "assistant", "content": ""})
+    yield "start", ""
+
+    # Generate response; tokens are grouped into frames so the UI and SSE
+    # clients get a handful of updates per second instead of one per token
+    with metrics.span("request"):
+        parts = []
+        try:
+            print(f"Generating response for: {message.strip()}")  # Debug
+            tokens = metrics.profiled(generate_response(message.strip(), history[:-1], session_id),  # Don't include the empty assistant message
+                                      "chat")
+            for frame in coalesce(tokens, STREAM_WINDOW_MS, STREAM_MAX_CHARS):
+                parts.append(frame)
+                yield "delta", frame
+            history[-1]["content"] = "".join(parts)
+        except Exception as e:
+            print(f"Error in chat_wrapper: {e}")
+            import traceback
+            traceback.print_exc()
+            metrics.inc("chatbot_fallbacks_total", reason="pipeline_error")
+            history[-1]["content"] = "I encountered an error while processing your request. Please try again."
+            yield "replace", history[-1]["content"]
+
+        # If no response was generated, provide a fallback
+        if not history[-1]["content"].strip():
+            print("No response generated, using fallback")  # Debug
+            history[-1]["content"] = ("I'm having trouble generating a response. "
+                                     "Please visit https://www.nileedgeinnovations.org "
+                                     "or contact us for assistance.")
+            yield "replace", history[-1]["content"]
+
+    print(f"Final response length: {len(history[-1]['content'])}")  # Debug
+    print(f"Final history length: {len(history)}")  # Debug
+
+    try:
+        # this turn's pair, not a diff against the stored length: API clients
+        # may send only the new message
+        history_store.append(session_id, history[-2:])
+        print("History saved successfully")  # Debug
+    except Exception as e:
+        print(f"Failed to save history: {e}")
+        import traceback
+        traceback.print_exc()
+
+def chat_wrapper(message, history, session_id="default"):
+    """Gradio handler: yields ("", history) with the answer growing frame by frame."""
+    if not message or not message.strip():
+        return "", history or []
+
+    history = history or []
+    parts = []
+    for kind, text in _answer_events(message, history, session_id):
+        if kind == "delta":
+            parts.append(text)
+            history[-1]["content"] = "".join(parts)
+        elif kind == "replace":
+            parts = [text]
+            history[-1]["content"] = text
+        yield "", history
+
+def chat_stream(message, history, session_id="default"):
+    """
+    SSE handler: yields only what changed - {"delta": text} frames,
+    {"replace": text} when the answer is swapped for a fallback, and a final
+    {"done": true}.  Clients append deltas to the last assistant message.
+    A client that sends no *history* gets the session's stored one.
+    """
+    if not message or not message.strip():
+        yield {"done": True}
+        return
+
+    history = list(history) if history else load_history(session_id)
+    for kind, text in _answer_events(message, history, session_id):
+        if kind != "start":
+            yield {kind: text}
+    yield {"done": True}
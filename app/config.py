@@ -6,3 +6,28 @@ EMAIL_PASSWORD = ""
 IMAP_SERVER = "imap.gmail.com"
 SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT = 465
+VECTOR_BATCH_SIZE = 256
+CACHE_CONTEXT_PREFIX = False   # also snapshot prompt state after the retrieved context
+STREAM_WINDOW_MS = 30          # coalesce streamed tokens into frames of at most this age
+STREAM_MAX_CHARS = 256         # ... or this many characters
+HISTORY_TTL_DAYS = 30          # chat sessions idle this long are pruned (0 = keep forever)
+IMAP_PORT = 993
+EMAIL_USE_SSL = True           # False for plain IMAP/SMTP (e.g. a local test server)
+EMAIL_FETCH_BATCH = 50         # messages per UID FETCH round trip
+EMAIL_WORKERS = 2              # replies generated concurrently
+EMAIL_IDLE_TIMEOUT = 29 * 60   # re-issue IDLE before servers drop it (RFC 2177)
+EMAIL_POLL_INTERVAL = 60       # seconds between polls when the server lacks IDLE
+EMAIL_CLUSTER_THRESHOLD = 0.92 # near-duplicate inbound mails share one generated answer
+EMAIL_REPLY_TEMPLATE = "Hi {name},\n\n{answer}\n"
+VECTOR_BACKEND = "chroma"      # "chroma" | "mmap" (memory-mapped .npy under data/vectors)
+VECTOR_DTYPE = "float32"       # mmap backend only; "float16" halves the file
+MAX_ANSWER_TOKENS = 512        # generation budget reserved in the context window
+CONTEXT_MAX_TOKENS = 1024      # retrieved-context cap, also bounded by what n_ctx leaves
+SUMMARY_MAX_TOKENS = 96       # rolling conversation summary, refreshed off the request path
+METRICS_ENABLED = True         # per-stage timings and counters on /metrics
+PROFILE_SLOW_MS = 0            # > 0: sample stacks and dump requests slower than this
+PROFILE_INTERVAL_MS = 5        # sampling period of the slow-request profiler
+FAQ_QUANTIZATION = "none"      # FAQ cache vectors: "none" (float32) | "int8" | "binary"
+VECTOR_QUANTIZATION = "none"   # mmap backend scan codes: "none" | "int8" | "binary"
+CACHE_POLICY = "lru"           # response cache eviction: "lru" | "lfu" | "ttl"
+CACHE_TTL_HOURS = 0            # > 0: cached answers expire after this many hours (any policy)
@@ -0,0 +1,49 @@
+"""
+Token-budgeted context assembly for the RAG prompt.
+
+Retrieved chunks are picked greedily by maximal marginal relevance: each
+step takes the chunk with the best trade-off between similarity to the
+question and dissimilarity to what is already packed.  Near-duplicates
+are dropped outright and a chunk that does not fit the remaining token
+budget is skipped in favour of smaller ones further down the list.
+"""
+
+import numpy as np
+
+MMR_LAMBDA    = 0.7           # 1.0 = pure relevance, 0.0 = pure diversity
+DUP_THRESHOLD = 0.95          # cosine similarity above which a chunk is a duplicate
+SEPARATOR     = "\n"
+
+
+def pack_context(hits, budget, count_tokens, mmr_lambda=MMR_LAMBDA,
+                 dup_threshold=DUP_THRESHOLD):
+    """
+    Choose chunks from *hits* ({document, score, vector} dicts, best first)
+    whose rendered size stays within *budget* tokens.  Returns
+    (chosen hits in selection order, tokens used).
+    """
+    if not hits or budget <= 0:
+        return [], 0
+
+    vecs   = np.stack([np.asarray(h["vector"], dtype=np.float32) for h in hits])
+    rel    = np.array([h["score"] for h in hits], dtype=np.float32)
+    sims   = vecs @ vecs.T
+    sep    = count_tokens(SEPARATOR)
+    left   = list(range(len(hits)))
+    chosen = []
+    used   = 0
+    while left:
+        if chosen:
+            redundancy = sims[np.ix_(left, chosen)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(left), dtype=np.float32)
+        i = int(np.argmax(mmr_lambda * rel[left] - (1 - mmr_lambda) * redundancy))
+        best, dup = left.pop(i), redundancy[i] >= dup_threshold
+        if dup:
+            continue
+        cost = count_tokens(hits[best]["document"]) + (sep if chosen else 0)
+        if used + cost > budget:
+            continue
+        chosen.append(best)
+        used += cost
+    return [hits[i] for i in chosen], used
@@ -0,0 +1,193 @@
+"""
+Bounded-concurrency site crawler used by app.scraper.
+
+Pages are fetched by a thread pool over one pooled requests.Session, in
+breadth-first order up to a configurable depth.  URLs are normalised and
+de-duplicated, each host is rate limited, transient failures are retried
+with exponential backoff, and ETag / Last-Modified validators from a
+local fetch cache turn unchanged pages into cheap 304 responses.
+"""
+
+import os, json, time, pathlib, threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+PROJECT_ROOT     = pathlib.Path(__file__).resolve().parents[1]
+FETCH_CACHE_FILE = PROJECT_ROOT / "data" / "fetch_cache.json"
+
+MAX_WORKERS   = 8
+CRAWL_DEPTH   = 1             # 0 = base page only, 1 = its links, ...
+HOST_INTERVAL = 0.2           # min seconds between requests to one host
+RETRIES       = 3
+BACKOFF       = 0.5           # seconds, doubled per retry
+TIMEOUT       = 10
+RETRY_STATUS  = {429, 500, 502, 503, 504}
+
+
+def is_gone(error) -> bool:
+    """True when a fetch failed because the page no longer exists (404 / 410)."""
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code in (404, 410)
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form used for de-duplication (no fragment, default port or empty path)."""
+    parts  = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host   = (parts.hostname or "").lower()
+    port   = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    path = parts.path or "/"
+    return urlunsplit((scheme, host, path, parts.query, ""))
+
+
+class _HostLimiter:
+    def __init__(self, interval):
+        self.interval = interval
+        self._next    = {}
+        self._lock    = threading.Lock()
+
+    def wait(self, host):
+        with self._lock:
+            now   = time.monotonic()
+            start = max(now, self._next.get(host, now))
+            self._next[host] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class Crawler:
+    def __init__(self, max_workers=MAX_WORKERS, host_interval=HOST_INTERVAL,
+                 retries=RETRIES, backoff=BACKOFF, timeout=TIMEOUT,
+                 cache_path=FETCH_CACHE_FILE, session=None):
+        self.failed      = {}                 # url -> exception, from the last crawl
+        self.max_workers = max_workers
+        self.retries     = retries
+        self.backoff     = backoff
+        self.timeout     = timeout
+        self.cache_path  = pathlib.Path(cache_path) if cache_path else None
+        self._limiter    = _HostLimiter(host_interval)
+        self._cache      = self._load_cache()
+        self._cache_lock = threading.Lock()
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+    # ─────────────────────────────────────────
+    # fetching
+    # ─────────────────────────────────────────
+    def fetch(self, url):
+        """Return (html, not_modified) for *url*; raises after the last retry."""
+        with self._cache_lock:
+            cached = self._cache.get(url)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        resp = self._get(url, headers)
+        if resp.status_code == 304:
+            if cached:
+                return cached["body"], True
+            # validators we did not send (or a lost cache entry): fetch the body
+            resp = self._get(url, {})
+        resp.raise_for_status()
+        with self._cache_lock:
+            self._cache[url] = {
+                "etag":          resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "body":          resp.text,
+            }
+        return resp.text, False
+
+    def _get(self, url, headers):
+        host  = urlsplit(url).netloc
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            self._limiter.wait(host)
+            try:
+                resp = self.session.get(url, headers=headers, timeout=self.timeout)
+                if resp.status_code not in RETRY_STATUS:
+                    return resp
+                error = requests.HTTPError(f"{resp.status_code} for {url}")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt == self.retries:
+                raise error
+            time.sleep(delay)
+            delay *= 2
+
+    # ─────────────────────────────────────────
+    # breadth-first crawl
+    # ─────────────────────────────────────────
+    def crawl(self, base_url, depth=CRAWL_DEPTH, extract_links=None):
+        """
+        Fetch *base_url* and internal pages up to *depth* links away.
+        *extract_links(html, page_url)* returns candidate URLs for a page
+        (relative links resolve against the page they appear on).
+        Returns a list of dicts {url, html, depth, not_modified} in BFS order;
+        pages that fail after retries are reported, skipped and left in
+        ``self.failed`` (url -> exception) until the next crawl.
+        """
+        start   = normalize_url(base_url)
+        seen    = {start}
+        results = []
+        self.failed = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {pool.submit(self.fetch, start): (start, 0)}
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    url, level = running.pop(fut)
+                    try:
+                        html, not_modified = fut.result()
+                    except Exception as e:
+                        print(f"Failed to scrape {url}: {e}")
+                        self.failed[url] = e
+                        continue
+                    results.append({"url": url, "html": html, "depth": level,
+                                    "not_modified": not_modified})
+                    if level >= depth or extract_links is None:
+                        continue
+                    for link in extract_links(html, url):
+                        link = normalize_url(link)
+                        if link not in seen:
+                            seen.add(link)
+                            running[pool.submit(self.fetch, link)] = (link, level + 1)
+
+        self._save_cache()
+        results.sort(key=lambda r: (r["depth"], r["url"]))
+        return results
+
+    # ─────────────────────────────────────────
+    # conditional-GET cache
+    # ─────────────────────────────────────────
+    def _load_cache(self):
+        if not self.cache_path:
+            return {}
+        try:
+            return json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_name(self.cache_path.name + ".tmp")
+            with self._cache_lock:
+                tmp.write_text(json.dumps(self._cache, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.cache_path)
+        except Exception as e:
+            print(f"Error saving fetch cache: {e}")
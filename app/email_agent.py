@@ -1,64 +1,327 @@
 import imaplib
 import smtplib
 import email
+import email.utils
 from email.mime.text import MIMEText
 import argparse
+import re
+import select
 import sys
 import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from app.chatbot import generate_response
-from app.config import EMAIL_ADDRESS, EMAIL_PASSWORD, IMAP_SERVER, SMTP_SERVER, SMTP_PORT
+from app.config import (EMAIL_ADDRESS, EMAIL_PASSWORD, IMAP_SERVER, IMAP_PORT,
+                        SMTP_SERVER, SMTP_PORT, EMAIL_USE_SSL, EMAIL_FETCH_BATCH,
+                        EMAIL_WORKERS, EMAIL_IDLE_TIMEOUT, EMAIL_POLL_INTERVAL,
+                        EMAIL_CLUSTER_THRESHOLD, EMAIL_REPLY_TEMPLATE)
 os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 
+# headers needed to reply and to decode the text part; the body is fetched
+# without attachments' headers and without marking the message \Seen
+FETCH_ITEMS = ("(BODY.PEEK[HEADER.FIELDS (FROM SUBJECT MESSAGE-ID REFERENCES "
+               "MIME-VERSION CONTENT-TYPE CONTENT-TRANSFER-ENCODING)] BODY.PEEK[TEXT])")
+_UID_RE = re.compile(rb"UID (\d+)")
+_SEQ_RE = re.compile(rb"(\d+) \(")                 # "<seq> (" opens each FETCH response
 
 
-def check_unread_emails():
-    imap = imaplib.IMAP4_SSL(IMAP_SERVER)
-    imap.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-    imap.select("inbox")
+def _plain_text(msg):
+    part = msg
+    if msg.is_multipart():
+        part = next((p for p in msg.walk() if p.get_content_type() == "text/plain"), None)
+        if part is None:
+            return ""
+    payload = part.get_payload(decode=True)
+    if not payload:
+        return ""
+    return payload.decode(part.get_content_charset() or "utf-8", errors="replace")
 
-    status, messages = imap.search(None, 'UNSEEN')
-    if status != "OK":
-        return []
 
-    mail_ids = messages[0].split()
-    unread_emails = []
-    for mail_id in mail_ids:
-        status, data = imap.fetch(mail_id, '(RFC822)')
-        msg = email.message_from_bytes(data[0][1])
-        subject = msg["subject"]
-        from_addr = email.utils.parseaddr(msg["from"])[1]
-        payload = msg.get_payload(decode=True)
-        body = payload.decode() if payload else ""
-        unread_emails.append({"from": from_addr, "subject": subject, "body": body})
+class Mailbox:
+    """Persistent IMAP connection: batched UID fetches, IDLE push, reconnect."""
 
-    imap.logout()
-    return unread_emails
+    def __init__(self, host=IMAP_SERVER, port=IMAP_PORT, user=EMAIL_ADDRESS,
+                 password=EMAIL_PASSWORD, use_ssl=EMAIL_USE_SSL, folder="inbox"):
+        self.host, self.port, self.use_ssl = host, port, use_ssl
+        self.user, self.password, self.folder = user, password, folder
+        self.imap = None
+        self.idle_rejected = False
 
-def send_email(to_addr, subject, body):
+    def connect(self):
+        cls = imaplib.IMAP4_SSL if self.use_ssl else imaplib.IMAP4
+        self.imap = cls(self.host, self.port)
+        self.imap.login(self.user, self.password)
+        self.imap.select(self.folder)
+
+    def ensure(self):
+        try:
+            if self.imap is not None and self.imap.noop()[0] == "OK":
+                return
+        except (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError):
+            pass
+        print("Connecting to IMAP server...")
+        self.connect()
+
+    def close(self):
+        try:
+            if self.imap is not None:
+                self.imap.logout()
+        except Exception:
+            pass
+        self.imap = None
+
+    def unseen_uids(self):
+        status, data = self.imap.uid("SEARCH", None, "UNSEEN")
+        return data[0].split() if status == "OK" and data and data[0] else []
+
+    def fetch(self, uids, batch=EMAIL_FETCH_BATCH):
+        """Headers + text body for *uids*, EMAIL_FETCH_BATCH messages per round trip."""
+        mails = []
+        for start in range(0, len(uids), batch):
+            chunk = b",".join(uids[start:start + batch]).decode()
+            status, data = self.imap.uid("FETCH", chunk, FETCH_ITEMS)
+            if status != "OK":
+                continue
+            # group by sequence number: the server may put UID after the
+            # literals (in the closing bytes) or interleave other FETCH replies
+            parts = {}
+            current = None
+            for item in data:
+                meta, payload = item if isinstance(item, tuple) else (item, None)
+                if not isinstance(meta, bytes):
+                    continue
+                m = _SEQ_RE.match(meta)
+                if m:
+                    current = parts.setdefault(m.group(1), {})
+                if current is None:
+                    continue
+                m = _UID_RE.search(meta)
+                if m:
+                    current["uid"] = m.group(1)
+                if payload is not None:
+                    current["text" if b"BODY[TEXT]" in meta else "header"] = payload
+            for p in parts.values():
+                if not {"uid", "header", "text"} <= p.keys():
+                    continue                           # flag update or truncated reply
+                msg = email.message_from_bytes(p["header"] + b"\r\n" + p["text"])
+                mails.append({
+                    "uid":        p["uid"],
+                    "from":       email.utils.parseaddr(msg["from"] or "")[1],
+                    "name":       email.utils.parseaddr(msg["from"] or "")[0],
+                    "subject":    msg["subject"] or "",
+                    "message_id": msg["message-id"],
+                    "references": msg["references"],
+                    "body":       _plain_text(msg),
+                })
+        return mails
+
+    def mark_seen(self, uids):
+        if uids:
+            self.imap.uid("STORE", b",".join(uids).decode(), "+FLAGS", "(\\Seen)")
+
+    def supports_idle(self):
+        return "IDLE" in self.imap.capabilities and not self.idle_rejected
+
+    def idle(self, timeout=EMAIL_IDLE_TIMEOUT):
+        """Block until the server announces new mail or *timeout* passes (RFC 2177)."""
+        imap = self.imap
+        tag = imap._new_tag()
+        imap.send(tag + b" IDLE\r\n")
+        reply = imap.readline()
+        if not reply:
+            raise imaplib.IMAP4.abort("connection closed starting IDLE")
+        if not reply.startswith(b"+"):
+            self.idle_rejected = True                  # poll from now on
+            raise imaplib.IMAP4.error(f"IDLE rejected: {reply.strip()!r}")
+        # wait with select() rather than a socket timeout: a timed-out
+        # socket file refuses further reads
+        sock = imap.sock
+        deadline = time.monotonic() + timeout
+        closed = False
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                pending = getattr(sock, "pending", lambda: 0)()    # buffered TLS data
+                if remaining <= 0 or not (pending or select.select([sock], [], [], remaining)[0]):
+                    break
+                line = imap.readline()
+                if not line:
+                    closed = True
+                    raise imaplib.IMAP4.abort("connection closed during IDLE")
+                if b"EXISTS" in line or b"RECENT" in line:
+                    break
+        finally:
+            if not closed:
+                self._end_idle(tag)
+
+    def _end_idle(self, tag):
+        """Send DONE and read up to IDLE's tagged completion."""
+        imap = self.imap
+        try:
+            imap.send(b"DONE\r\n")
+            while True:
+                line = imap.readline()
+                if not line:
+                    raise imaplib.IMAP4.abort("connection closed ending IDLE")
+                if line.startswith(tag):
+                    return
+        except OSError as e:
+            raise imaplib.IMAP4.abort(f"connection lost ending IDLE: {e}") from e
+
+
+class Mailer:
+    """One SMTP connection reused for every reply, re-opened when it drops."""
+
+    def __init__(self, host=SMTP_SERVER, port=SMTP_PORT, user=EMAIL_ADDRESS,
+                 password=EMAIL_PASSWORD, use_ssl=EMAIL_USE_SSL):
+        self.host, self.port, self.use_ssl = host, port, use_ssl
+        self.user, self.password = user, password
+        self.smtp = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        cls = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        self.smtp = cls(self.host, self.port)
+        if self.user:
+            self.smtp.login(self.user, self.password)
+
+    def send(self, msg):
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self.smtp is None:
+                        self._connect()
+                    self.smtp.send_message(msg)
+                    return
+                except (smtplib.SMTPServerDisconnected, OSError):
+                    self.smtp = None
+                    if attempt:
+                        raise
+
+    def close(self):
+        with self._lock:
+            try:
+                if self.smtp is not None:
+                    self.smtp.quit()
+            except Exception:
+                pass
+            self.smtp = None
+
+
+def build_reply(mail, body):
     msg = MIMEText(body)
-    msg["Subject"] = f"Re: {subject}"
+    msg["Subject"] = f"Re: {mail['subject']}"
     msg["From"] = EMAIL_ADDRESS
-    msg["To"] = to_addr
+    msg["To"] = mail["from"]
+    if mail.get("message_id"):
+        msg["In-Reply-To"] = mail["message_id"]
+        msg["References"] = " ".join(filter(None, [mail.get("references"), mail["message_id"]]))
+    return msg
+
+
+def answer(text):
+    # imported on first use so --help and connection errors don't load the models
+    from app.chatbot import generate_response
+    return "".join(generate_response(text)).strip()
+
+
+def cluster_mails(mails, threshold=EMAIL_CLUSTER_THRESHOLD):
+    """Group near-identical inquiries so each distinct question is answered once."""
+    if len(mails) < 2:
+        return [mails] if mails else []
+    from app import resources
+    from app.embeddings import cluster_vectors
+    vecs = resources.get("embedder").encode([m["body"] for m in mails])
+    return [[mails[i] for i in idx] for idx in cluster_vectors(vecs, threshold)]
+
+
+def personalize(answer_text, mail):
+    name = (mail.get("name") or "").split(" ")[0] or "there"
+    return EMAIL_REPLY_TEMPLATE.format(name=name, answer=answer_text)
+
+
+def process_emails(mailbox, mailer, pool):
+    """Answer every unread message; returns the number of replies sent."""
+    mails = mailbox.fetch(mailbox.unseen_uids())
+    if not mails:
+        return 0
+    try:
+        clusters = cluster_mails(mails)
+    except Exception as e:                             # e.g. the embedder failed to load
+        print(f"Clustering failed ({e}); answering each message separately")
+        clusters = [[m] for m in mails]
+
+    def reply(cluster):
+        text = answer(cluster[0]["body"])              # one generation per cluster
+        sent = []
+        for mail in cluster:
+            print(f"Responding to: {mail['from']}")
+            try:
+                mailer.send(build_reply(mail, personalize(text, mail)))
+                sent.append(mail["uid"])
+                print("Response sent.")
+            except Exception as e:
+                print(f"Failed to answer {mail['from']}: {e}")
+        return sent
+
+    done = []
+    for cluster, fut in [(c, pool.submit(reply, c)) for c in clusters]:
+        try:
+            done.extend(fut.result())
+        except Exception as e:
+            print(f"Failed to answer {len(cluster)} message(s) like {cluster[0]['from']}: {e}")
+    mailbox.mark_seen(done)
+    print(f"{len(mails)} emails, {len(clusters)} generations "
+          f"({len(mails) - len(clusters)} LLM calls saved).")
+    return len(done)
+
 
-    smtp = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT)
-    smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-    smtp.send_message(msg)
-    smtp.quit()
+def run(mode, mailbox=None, mailer=None, workers=EMAIL_WORKERS):
+    mailbox = mailbox or Mailbox()
+    mailer  = mailer or Mailer()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            while True:
+                try:
+                    mailbox.ensure()
+                    process_emails(mailbox, mailer, pool)
+                    if mode == "manual":
+                        return
+                    if mailbox.supports_idle():
+                        mailbox.idle()
+                    else:
+                        time.sleep(EMAIL_POLL_INTERVAL)
+                except (imaplib.IMAP4.error, OSError) as e:   # abort is an IMAP4.error
+                    if mode == "manual":
+                        raise
+                    print(f"Mail connection lost ({e}); reconnecting...")
+                    mailbox.close()
+                    time.sleep(5)
+                except Exception as e:                 # one bad batch must not stop the agent
+                    if mode == "manual":
+                        raise
+                    print(f"Failed to process mail: {e}")
+                    time.sleep(EMAIL_POLL_INTERVAL)
+        finally:
+            mailbox.close()
+            mailer.close()
 
-def process_emails():
-    emails = check_unread_emails()
-    for mail in emails:
-        print(f"Responding to: {mail['from']}")
-        reply = generate_response(mail["body"])
-        send_email(mail["from"], mail["subject"], reply)
-        print("Response sent.")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--mode", choices=["manual", "scheduled"], default="manual")
+    parser.add_argument("--mode", choices=["manual", "scheduled"], default="manual",
+                        help="manual: answer unread mail once; scheduled: stay "
+                             "connected and answer new mail as it arrives (IMAP IDLE)")
     args = parser.parse_args()
 
     print(f"Running email agent in {args.mode} mode...")
-    process_emails()
+    import atexit, signal
+    from app.chatbot import save_data
+    atexit.register(save_data)          # persist FAQ cache, question log and index
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))   # run atexit on `kill` too
+    if args.mode == "scheduled":
+        from app.chatbot import warmup
+        warmup()
+    run(args.mode)
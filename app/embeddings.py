@@ -0,0 +1,124 @@
+"""
+Process-wide sentence-embedding service.
+
+One SentenceTransformer is shared by the FAQ cache and the retrieval
+layer.  Query embeddings go through a bounded LRU keyed on normalised
+text, and concurrent cache misses are micro-batched into a single forward
+pass by a background thread.
+"""
+
+import queue, threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+MODEL_NAME       = "all-MiniLM-L6-v2"
+QUERY_CACHE_SIZE = 2_048
+BATCH_WINDOW     = 0.005      # seconds to wait for more queries to join a batch
+MAX_BATCH        = 64
+
+
+def normalize_text(text: str) -> str:
+    # MiniLM is uncased, so case and whitespace do not change the vector
+    return " ".join(text.lower().split())
+
+
+class EmbeddingService:
+    def __init__(self, model_name=MODEL_NAME, cache_size=QUERY_CACHE_SIZE,
+                 batch_window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        from sentence_transformers import SentenceTransformer
+
+        self.model        = SentenceTransformer(model_name)
+        self.dim          = self.model.get_sentence_embedding_dimension()
+        self.cache_size   = cache_size
+        self.batch_window = batch_window
+        self.max_batch    = max_batch
+
+        self._cache      = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue      = queue.Queue()
+        threading.Thread(target=self._batch_loop, daemon=True,
+                         name="embedding-batcher").start()
+
+    def encode(self, texts):
+        """Bulk encode (documents, cache keys); returns an (n, dim) float32 array."""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.asarray(self.model.encode(list(texts), normalize_embeddings=True),
+                          dtype=np.float32)
+
+    def encode_query(self, text: str):
+        """Normalised embedding for one query, served from the LRU when possible."""
+        key = normalize_text(text)
+        with self._cache_lock:
+            vec = self._cache.get(key)
+            if vec is not None:
+                self._cache.move_to_end(key)
+                return vec
+
+        fut = Future()
+        self._queue.put((key, fut))
+        vec = fut.result()
+
+        with self._cache_lock:
+            self._cache[key] = vec
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vec
+
+    def _batch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self._queue.get(timeout=self.batch_window))
+            except queue.Empty:
+                pass
+
+            texts = list(dict.fromkeys(key for key, _ in batch))
+            try:
+                vecs = dict(zip(texts, self.encode(texts)))
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for key, fut in batch:
+                vec = vecs[key]
+                vec.flags.writeable = False
+                fut.set_result(vec)
+
+
+_service      = None
+_service_lock = threading.Lock()
+
+def get_embedder() -> EmbeddingService:
+    """Return the process-wide EmbeddingService, loading the model on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+    return _service
+
+
+def cluster_vectors(vecs, threshold):
+    """
+    Greedy leader clustering of normalised *vecs*: each row joins the most
+    similar leader if cosine similarity >= *threshold*, else starts a cluster.
+    Returns lists of row indices, leader first, in input order.
+    """
+    vecs     = np.asarray(vecs, dtype=np.float32)
+    leaders  = []
+    clusters = []
+    for i, vec in enumerate(vecs):
+        if leaders:
+            sims = vecs[leaders] @ vec
+            best = int(sims.argmax())
+            if sims[best] >= threshold:
+                clusters[best].append(i)
+                continue
+        leaders.append(i)
+        clusters.append([i])
+    return clusters
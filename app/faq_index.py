@@ -0,0 +1,173 @@
+"""Normalized embedding matrix kept in sync with the FAQ response cache."""
+
+import os, pathlib, threading
+import numpy as np
+
+from app.quantize import quantize_int8, pack_signs, int8_scores, shortlist
+
+RERANK = 128                  # binary mode: Hamming shortlist reranked with int8 codes
+
+
+def _normalize(vecs):
+    vecs  = np.asarray(vecs, dtype=np.float32)
+    norms = np.linalg.norm(vecs, axis=-1, keepdims=True)
+    return vecs / np.maximum(norms, 1e-12)
+
+
+class FaqIndex:
+    """
+    One row per cached question.  Rows live in growable buffers so inserts
+    are amortised O(1); removals swap the last row into the freed slot.
+    A lookup is a single matrix-vector product over the used rows.
+    Mutations and lookups hold one lock, so concurrent answers cannot
+    tear the key <-> row mapping.
+
+    *quantization* "int8" keeps int8 codes and a scale per row instead of
+    float32 (4x less memory); "binary" adds sign bits that are scanned
+    first, with the Hamming shortlist reranked on the int8 codes.
+    """
+
+    def __init__(self, dim=384, quantization="none"):
+        self.dim   = dim
+        self.mode  = quantization
+        self.keys  = []                                   # row -> key
+        self.rows  = {}                                   # key -> row
+        self._lock = threading.Lock()
+        if quantization == "none":
+            self._bufs = {"matrix": np.zeros((16, dim), dtype=np.float32)}
+        else:
+            self._bufs = {"codes":  np.zeros((16, dim), dtype=np.int8),
+                          "scales": np.zeros(16, dtype=np.float32)}
+            if quantization == "binary":
+                self._bufs["bits"] = np.zeros((16, (dim + 7) // 8), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def _used(self, name):
+        return self._bufs[name][:len(self.keys)]
+
+    @property
+    def matrix(self):
+        """Float32 rows (dequantized when the index is quantized), as a copy."""
+        with self._lock:
+            if self.mode == "none":
+                return self._used("matrix").copy()
+            return self._used("codes") * self._used("scales")[:, None]
+
+    def nbytes(self):
+        return sum(self._used(name).nbytes for name in self._bufs)
+
+    def _encode(self, vec):
+        vec = _normalize(vec)
+        if self.mode == "none":
+            return {"matrix": vec}
+        codes, scales = quantize_int8(vec)
+        row = {"codes": codes[0], "scales": scales[0]}
+        if self.mode == "binary":
+            row["bits"] = pack_signs(vec)[0]
+        return row
+
+    def add(self, key, vec):
+        row = self._encode(vec)
+        with self._lock:
+            self._add(key, row)
+
+    def _add(self, key, row):
+        if key in self.rows:
+            for name, value in row.items():
+                self._bufs[name][self.rows[key]] = value
+            return
+        n = len(self.keys)
+        for name, value in row.items():
+            buf = self._bufs[name]
+            if n == len(buf):
+                grown = np.zeros((2 * n,) + buf.shape[1:], dtype=buf.dtype)
+                grown[:n] = buf
+                self._bufs[name] = buf = grown
+            buf[n] = value
+        self.rows[key] = n
+        self.keys.append(key)
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last     = len(self.keys) - 1
+        last_key = self.keys.pop()
+        if row != last:
+            for buf in self._bufs.values():
+                buf[row] = buf[last]
+            self.keys[row]      = last_key
+            self.rows[last_key] = row
+
+    def search(self, query_vec):
+        """Return (key, cosine similarity) of the best row, or (None, 0.0)."""
+        query = _normalize(query_vec)
+        with self._lock:
+            return self._search(query)
+
+    def _search(self, query):
+        if not self.keys:
+            return None, 0.0
+        if self.mode == "none":
+            sims = self._used("matrix") @ query
+            best = int(sims.argmax())
+            return self.keys[best], float(sims[best])
+
+        codes, scales = self._used("codes"), self._used("scales")
+        if self.mode == "binary":
+            rows = shortlist("binary", query, 1, RERANK, bits=self._used("bits"))
+            codes, scales = codes[rows], scales[rows]
+        else:
+            rows = None
+        sims = int8_scores(codes, scales, query)
+        best = int(sims.argmax())
+        return self.keys[best if rows is None else int(rows[best])], float(sims[best])
+
+    # ─────────────────────────────────────────
+    # persistence
+    # ─────────────────────────────────────────
+    def save(self, path):
+        path = pathlib.Path(path)
+        tmp  = path.with_name(path.name + ".tmp")
+        with self._lock:
+            keys   = np.array(self.keys, dtype=str)
+            arrays = {name: self._used(name).copy() for name in self._bufs if name != "bits"}
+        with open(tmp, "wb") as f:
+            np.savez(f, keys=keys, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, keys, encode, dim=384, quantization="none"):
+        """
+        Rebuild the index for *keys* (in cache order), reusing rows stored at
+        *path* (float32 or int8) and calling *encode(list_of_texts)* only for
+        keys it lacks.
+        """
+        stored = {}
+        try:
+            with np.load(path) as npz:
+                if "matrix" in npz:
+                    matrix = npz["matrix"]
+                else:
+                    matrix = npz["codes"] * npz["scales"][:, None]
+                if matrix.shape[-1] == dim:
+                    stored = dict(zip(npz["keys"].tolist(), matrix))
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            pass
+
+        index   = cls(dim=dim, quantization=quantization)
+        missing = [k for k in keys if k not in stored]
+        if missing:
+            stored.update(zip(missing, encode(missing)))
+        for k in keys:
+            index.add(k, stored[k])
+        return index
@@ -0,0 +1,168 @@
+"""
+Session-keyed chat history in SQLite (WAL mode).
+
+Every message is one row, so saving a turn appends the new rows only and
+concurrent sessions never rewrite each other's data.  Each session's
+message count is kept in its own table and updated in the same
+transaction as the rows it counts.  Reads are paged newest-first with an
+opaque cursor (the row id of the oldest message already returned).
+Sessions idle for longer than the TTL are pruned.
+"""
+
+import json, time, sqlite3, pathlib, threading, contextlib
+
+PRUNE_EVERY = 500             # appends between retention sweeps
+
+
+class HistoryStore:
+    def __init__(self, path, ttl_days=30, legacy_json=None):
+        self.path     = pathlib.Path(path)
+        self.ttl_days = ttl_days
+        self._local   = threading.local()
+        self._lock    = threading.Lock()
+        self._appends = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS messages (
+                              id      INTEGER PRIMARY KEY AUTOINCREMENT,
+                              session TEXT    NOT NULL,
+                              role    TEXT    NOT NULL,
+                              content TEXT    NOT NULL,
+                              created REAL    NOT NULL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS messages_session ON messages(session, id)")
+            new = not db.execute("SELECT 1 FROM sqlite_master WHERE name = 'sessions'").fetchone()
+            db.execute("""CREATE TABLE IF NOT EXISTS sessions (
+                              session TEXT    PRIMARY KEY,
+                              length  INTEGER NOT NULL,
+                              updated REAL    NOT NULL)""")
+            if new:                                     # databases from before the table
+                db.execute("""INSERT INTO sessions (session, length, updated)
+                              SELECT session, COUNT(*), MAX(created) FROM messages
+                              GROUP BY session""")
+        if legacy_json is not None:
+            self._import_legacy(pathlib.Path(legacy_json))
+        self.prune()
+
+    def _conn(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Write transaction that takes the lock up front, so reads inside it stay current."""
+        db = self._conn()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.rollback()
+            raise
+        db.commit()
+
+    def _length(self, db, session):
+        row = db.execute("SELECT length FROM sessions WHERE session = ?", (session,)).fetchone()
+        return row[0] if row else 0
+
+    # ─────────────────────────────────────────
+    # writes
+    # ─────────────────────────────────────────
+    def _insert(self, db, session, messages):
+        now  = time.time()
+        rows = [(session, m["role"], m["content"], now) for m in messages]
+        if not rows:
+            return 0
+        db.executemany("INSERT INTO messages (session, role, content, created) "
+                       "VALUES (?, ?, ?, ?)", rows)
+        db.execute("""INSERT INTO sessions (session, length, updated) VALUES (?, ?, ?)
+                      ON CONFLICT(session) DO UPDATE SET length = length + excluded.length,
+                                                         updated = excluded.updated""",
+                   (session, len(rows), now))
+        return len(rows)
+
+    def _appended(self, n):
+        with self._lock:
+            self._appends += n
+            sweep = self._appends >= PRUNE_EVERY
+            if sweep:
+                self._appends = 0
+        if sweep:
+            self.prune()
+
+    def append(self, session, messages):
+        with self._transaction() as db:
+            n = self._insert(db, session, messages)
+        self._appended(n)
+
+    def sync(self, session, history):
+        """
+        Persist the client's full *history* for *session*, writing only the
+        messages beyond the stored length.  A shorter history writes
+        nothing; clearing a session is an explicit clear().
+        """
+        with self._transaction() as db:
+            n = self._insert(db, session, history[self._length(db, session):])
+        self._appended(n)
+
+    def clear(self, session):
+        with self._transaction() as db:
+            db.execute("DELETE FROM messages WHERE session = ?", (session,))
+            db.execute("DELETE FROM sessions WHERE session = ?", (session,))
+
+    def prune(self):
+        """Drop sessions whose newest message is older than the TTL."""
+        if not self.ttl_days:
+            return 0
+        cutoff = time.time() - self.ttl_days * 86_400
+        with self._transaction() as db:
+            cur = db.execute("""DELETE FROM messages WHERE session IN (
+                                    SELECT session FROM sessions WHERE updated < ?)""", (cutoff,))
+            db.execute("DELETE FROM sessions WHERE updated < ?", (cutoff,))
+        return cur.rowcount
+
+    # ─────────────────────────────────────────
+    # reads
+    # ─────────────────────────────────────────
+    def page(self, session, cursor=None, limit=50):
+        """
+        Up to *limit* messages older than *cursor* (newest page when None),
+        in chronological order, plus the cursor for the next older page.
+        Raises ValueError for a cursor this store did not hand out.
+        """
+        if cursor and not str(cursor).isdigit():
+            raise ValueError(f"invalid cursor: {cursor!r}")
+        rows = self._conn().execute(
+            "SELECT id, role, content FROM messages WHERE session = ? AND id < ? "
+            "ORDER BY id DESC LIMIT ?",
+            (session, int(cursor) if cursor else 2 ** 63 - 1, limit + 1)).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit][::-1]
+        return {
+            "messages":    [{"role": r[1], "content": r[2]} for r in rows],
+            "next_cursor": str(rows[0][0]) if more and rows else None,
+        }
+
+    def load(self, session):
+        rows = self._conn().execute(
+            "SELECT role, content FROM messages WHERE session = ? ORDER BY id",
+            (session,)).fetchall()
+        return [{"role": r[0], "content": r[1]} for r in rows]
+
+    def _import_legacy(self, path):
+        """One-off import of the old single-file history into the default session."""
+        if self._length(self._conn(), "default"):
+            return
+        try:
+            messages = json.loads(path.read_text(encoding="utf-8") or "[]")
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        messages = [m for m in messages
+                    if isinstance(m, dict) and m.get("content", "").strip()]
+        if messages:
+            self.append("default", messages)
+            path.rename(path.with_name(path.name + ".imported"))
@@ -0,0 +1,72 @@
+"""
+Version of the knowledge base, shared between refresh_kb and the chat
+processes through data/kb_state.json.
+
+    {"version": "...", "ids": [live chunk ids],
+     "history": [{"version": "...", "removed": [chunk ids gone in that refresh]}, ...]}
+
+The version is a hash of the live chunk ids (content hashes), so a
+refresh that changes nothing keeps the version.  Readers re-read the file
+only when its mtime changes.
+"""
+
+import os, json, hashlib, pathlib
+
+KB_STATE_FILE = pathlib.Path(__file__).resolve().parents[1] / "data" / "kb_state.json"
+HISTORY       = 50            # refreshes remembered for selective invalidation
+
+
+def _read(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"version": None, "ids": [], "history": []}
+
+
+def record_refresh(ids, path=KB_STATE_FILE):
+    """Store the new live chunk *ids*; returns (version, ids removed by this refresh)."""
+    path    = pathlib.Path(path)
+    state   = _read(path)
+    ids     = sorted(set(ids))
+    version = hashlib.sha1("\n".join(ids).encode("ascii")).hexdigest()[:12]
+    if version == state["version"]:
+        return version, []
+
+    removed = sorted(set(state["ids"]) - set(ids))
+    history = (state["history"] + [{"version": version, "removed": removed}])[-HISTORY:]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "ids": ids, "history": history}, f)
+    os.replace(tmp, path)
+    return version, removed
+
+
+class KbState:
+    def __init__(self, path=KB_STATE_FILE):
+        self.path   = pathlib.Path(path)
+        self._mtime = None
+        self._state = _read(self.path)
+
+    def _refresh(self):
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._mtime:
+            self._state = _read(self.path)
+            self._mtime = mtime
+
+    def version(self):
+        self._refresh()
+        return self._state["version"]
+
+    def removed_since(self, version):
+        """Chunk ids removed after *version*, or None when *version* is unknown."""
+        self._refresh()
+        history = self._state["history"]
+        for i, entry in enumerate(history):
+            if entry["version"] == version:
+                return {cid for later in history[i + 1:] for cid in later["removed"]}
+        return None
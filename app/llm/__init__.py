@@ -6,9 +6,25 @@ Env vars
 LLM_ENGINE   llama_cpp (default) | vllm | openai
 MODEL_PATH   overrides app.config.MODEL_PATH
 LLM_THREADS  logical cores (default 4)
+LLM_N_CTX    context window in tokens (default 2048)
+LLM_WORKERS  llama_cpp worker instances (default cpu_count // LLM_THREADS)
+LLM_PREFIX_CACHE_MB    RAM for prompt-prefix states (default 1024, 0 = off)
+LLM_PREFIX_DISK_MB     disk for prompt-prefix states (default 4096, 0 = RAM only)
+LLM_PREFIX_CACHE_DIR   where states are written (default data/kv_cache)
+LLM_SPECULATIVE        off (default) | prompt_lookup | draft
+LLM_DRAFT_MODEL        small GGUF with the same vocabulary (for =draft)
+LLM_DRAFT_TOKENS       tokens proposed per step (default 10)
+
+vllm / openai (OpenAI-compatible streaming server)
+LLM_BASE_URL   server root incl. /v1 (vllm default http://localhost:8000/v1)
+LLM_MODEL      model name sent with each request
+LLM_API        completions (default) | chat
+OPENAI_API_KEY bearer token, if the server needs one
+LLM_TIMEOUT    seconds to wait for each read from the server (default 60)
+LLM_RETRIES    retries before the first token (default 2)
 """
 import os, pathlib
-from .llama_cpp import LlamaCppEngine
+from .pool import EnginePool
 from app.config import MODEL_PATH as CONFIG_PATH          # "models/mistral.gguf"
 
 # project root = two levels above this file (…/response_aigent)
@@ -23,11 +39,51 @@ def get_engine():
     choice = os.getenv("LLM_ENGINE", "llama_cpp").lower()
 
     if choice == "llama_cpp":
+        from .llama_cpp import LlamaCppEngine, PrefixStateCache, make_draft_model
+
         model_path = _abs(os.getenv("MODEL_PATH", CONFIG_PATH))
-        return LlamaCppEngine(
-            model_path=model_path,
-            n_ctx=2048,
-            n_threads=int(os.getenv("LLM_THREADS", 4)),
+        n_threads  = int(os.getenv("LLM_THREADS", 4))
+        n_ctx      = int(os.getenv("LLM_N_CTX", 2048))
+        workers    = int(os.getenv("LLM_WORKERS", 0)) or max(1, (os.cpu_count() or 1) // n_threads)
+        ram_mb     = int(os.getenv("LLM_PREFIX_CACHE_MB", 1024))
+        disk_mb    = int(os.getenv("LLM_PREFIX_DISK_MB", 4096))
+        prefix_cache = PrefixStateCache(
+            capacity_bytes=ram_mb << 20,
+            disk_dir=_abs(os.getenv("LLM_PREFIX_CACHE_DIR", "data/kv_cache")) if disk_mb else None,
+            disk_capacity_bytes=disk_mb << 20,
+        ) if ram_mb else None
+        speculative = os.getenv("LLM_SPECULATIVE", "off").lower()
+        draft_path  = os.getenv("LLM_DRAFT_MODEL")
+        return EnginePool(
+            lambda: LlamaCppEngine(
+                model_path=model_path,
+                n_ctx=n_ctx,
+                n_threads=n_threads,
+                prefix_cache=prefix_cache,
+                draft_model=make_draft_model(
+                    speculative, n_ctx, n_threads,
+                    draft_model_path=_abs(draft_path) if draft_path else None,
+                    num_pred_tokens=int(os.getenv("LLM_DRAFT_TOKENS", 10)),
+                ),
+            ),
+            workers=workers,
         )
 
+    if choice in ("vllm", "openai"):
+        from .vllm import VLLMEngine
+        from .openai import OpenAIEngine
+
+        kw = {
+            "api":         os.getenv("LLM_API", "completions"),
+            "api_key":     os.getenv("OPENAI_API_KEY"),
+            "timeout":     float(os.getenv("LLM_TIMEOUT", 60)),
+            "max_retries": int(os.getenv("LLM_RETRIES", 2)),
+            "n_ctx":       int(os.getenv("LLM_N_CTX", 2048)),
+        }
+        if os.getenv("LLM_BASE_URL"):
+            kw["base_url"] = os.getenv("LLM_BASE_URL")
+        if os.getenv("LLM_MODEL"):
+            kw["model"] = os.getenv("LLM_MODEL")
+        return VLLMEngine(**kw) if choice == "vllm" else OpenAIEngine(**kw)
+
     raise ValueError(f"Unsupported LLM_ENGINE='{choice}'")
@@ -1,19 +1,277 @@
 """Thin wrapper around llama-cpp-python that streams tokens."""
 
+import os, time, pickle, hashlib, pathlib, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 from llama_cpp import Llama
+from llama_cpp.llama_speculative import LlamaDraftModel, LlamaPromptLookupDecoding
 from app.config import MODEL_PATH
 
+
+def _common_prefix(a, b):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class PrefixStateCache:
+    """
+    Llama states snapshotted right after a shared prompt prefix.
+
+    Keyed by a hash of (model, n_ctx, prefix tokens).  Kept in a bounded
+    in-memory LRU and written through to a bounded directory on disk so a
+    restarted process can skip the prefill as well.  Shared by all workers
+    of an EnginePool: states load into any Llama built from the same model.
+    """
+
+    def __init__(self, capacity_bytes, disk_dir=None, disk_capacity_bytes=0):
+        self.capacity_bytes      = capacity_bytes
+        self.disk_dir            = pathlib.Path(disk_dir) if disk_dir else None
+        self.disk_capacity_bytes = disk_capacity_bytes
+        self._ram   = OrderedDict()                    # key -> LlamaState
+        self._size  = 0
+        self._lock  = threading.Lock()
+        self._disk  = ThreadPoolExecutor(max_workers=1) if self.disk_dir else None
+        self.hits   = 0
+        self.misses = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(model_id, tokens):
+        h = hashlib.sha1(model_id.encode("utf-8"))
+        h.update(",".join(map(str, tokens)).encode("ascii"))
+        return h.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            state = self._ram.get(key)
+            if state is not None:
+                self._ram.move_to_end(key)
+                self.hits += 1
+                return state
+        path = self.disk_dir / f"{key}.pkl" if self.disk_dir else None
+        if path is not None and path.exists():
+            try:
+                with open(path, "rb") as f:
+                    state = pickle.load(f)
+                os.utime(path)
+                self._remember(key, state)
+                with self._lock:
+                    self.hits += 1
+                return state
+            except Exception as e:
+                print(f"Error loading prefix state {path}: {e}")
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, state):
+        self._remember(key, state)
+        if self._disk is not None:
+            self._disk.submit(self._write, key, state)
+
+    def _remember(self, key, state):
+        with self._lock:
+            if key in self._ram:
+                return
+            self._ram[key] = state
+            self._size += state.llama_state_size
+            while self._size > self.capacity_bytes and len(self._ram) > 1:
+                _, old = self._ram.popitem(last=False)
+                self._size -= old.llama_state_size
+
+    def _write(self, key, state):
+        try:
+            path = self.disk_dir / f"{key}.pkl"
+            tmp  = path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+            files = sorted(self.disk_dir.glob("*.pkl"), key=lambda p: p.stat().st_mtime)
+            total = sum(p.stat().st_size for p in files)
+            while files and total > self.disk_capacity_bytes:
+                old = files.pop(0)
+                total -= old.stat().st_size
+                old.unlink(missing_ok=True)
+        except Exception as e:
+            print(f"Error writing prefix state: {e}")
+
+
+class GgufDraftModel(LlamaDraftModel):
+    """Greedy drafts from a small GGUF model sharing the main model's vocabulary."""
+
+    def __init__(self, model_path, n_ctx, n_threads, num_pred_tokens=10):
+        self.llm = Llama(
+            model_path=model_path,
+            n_ctx=n_ctx,
+            n_batch=512,
+            n_threads=n_threads,
+            n_gpu_layers=0,
+            verbose=False,
+        )
+        self.num_pred_tokens = num_pred_tokens
+
+    def __call__(self, input_ids, /, **kwargs):
+        draft = []
+        # generate() reuses the draft model's KV cache for the shared prefix
+        for tok in self.llm.generate(input_ids.tolist(), top_k=1, temp=0.0):
+            draft.append(tok)
+            if len(draft) >= self.num_pred_tokens:
+                break
+        return np.array(draft, dtype=np.intc)
+
+
+class _CountingDraft(LlamaDraftModel):
+    """
+    Counts speculative tokens from the token ids llama.cpp passes in.  Each
+    call sees the accepted sequence so far; between two calls it grows by
+    the verified token plus the drafts that were accepted.
+    """
+
+    def __init__(self, inner):
+        self.inner    = inner
+        self.calls    = 0
+        self.proposed = 0
+        self.verified = 0          # proposed tokens whose verification was observed
+        self.accepted = 0
+        self.tokens   = 0          # tokens generated while drafting
+        self.start()
+
+    def start(self):
+        """Forget the previous sequence (call at the start of each completion)."""
+        self._last    = None
+        self._pending = 0
+
+    def __call__(self, input_ids, /, **kwargs):
+        n = len(input_ids)
+        if self._last is None:
+            self.tokens += 1                           # first token, sampled from the prompt
+        else:
+            self.tokens   += n - self._last
+            self.accepted += max(0, n - self._last - 1)
+            self.verified += self._pending
+        draft = self.inner(input_ids, **kwargs)
+        self._last, self._pending = n, len(draft)
+        self.calls    += 1
+        self.proposed += len(draft)
+        return draft
+
+
+def make_draft_model(mode, n_ctx, n_threads, draft_model_path=None, num_pred_tokens=10):
+    """Draft model for *mode* ("prompt_lookup" | "draft"), or None when off."""
+    if mode in (None, "", "off"):
+        return None
+    if mode == "prompt_lookup":
+        return LlamaPromptLookupDecoding(num_pred_tokens=num_pred_tokens)
+    if mode == "draft":
+        if not draft_model_path:
+            raise ValueError("LLM_SPECULATIVE=draft needs LLM_DRAFT_MODEL")
+        return GgufDraftModel(draft_model_path, n_ctx, n_threads, num_pred_tokens)
+    raise ValueError(f"Unsupported LLM_SPECULATIVE='{mode}'")
+
+
 class LlamaCppEngine:
-    def __init__(self, model_path, n_ctx, n_threads):
+    def __init__(self, model_path, n_ctx, n_threads, prefix_cache=None, draft_model=None):
+        self.draft = _CountingDraft(draft_model) if draft_model is not None else None
         self.llm = Llama(
             model_path=model_path,
             n_ctx=n_ctx,
             n_batch=512,
             n_threads=n_threads,
             n_gpu_layers=0,
+            draft_model=self.draft,
         )
+        self.n_ctx        = n_ctx
+        self.prefix_cache = prefix_cache
+        self._model_id    = f"{model_path}:{n_ctx}"
+        self._decode_s    = 0.0        # decode time with drafting enabled
+
+    def count_tokens(self, text):
+        """Tokens *text* adds to a prompt (no BOS), using the model's own vocabulary."""
+        return len(self.llm.tokenize(text.encode("utf-8"), add_bos=False, special=True))
+
+    def spec_stats(self):
+        """
+        Speculative-decoding counters, in tokens (see _CountingDraft).  The
+        acceptance rate only counts drafts whose verification was seen, so
+        the last draft of each completion does not skew it.
+        """
+        if self.draft is None:
+            return None
+        d = self.draft
+        return {
+            "draft_calls":     d.calls,
+            "proposed":        d.proposed,
+            "verified":        d.verified,
+            "accepted":        d.accepted,
+            "acceptance_rate": round(d.accepted / d.verified, 3) if d.verified else None,
+            "tokens":          d.tokens,
+            "tokens_per_s":    round(d.tokens / self._decode_s, 1) if self._decode_s else None,
+        }
+
+    def _restore_prefix(self, tokens, prefixes):
+        """
+        Start the context from the longest cached state among *prefixes* so
+        only the rest of *tokens* is evaluated.  Longer prefixes that are not
+        cached yet are prefilled once and snapshotted for later requests.
+        """
+        if isinstance(prefixes, str):
+            prefixes = [prefixes]
+        levels = sorted({
+            _common_prefix(self.llm.tokenize(p.encode("utf-8"), add_bos=True, special=True), tokens)
+            for p in prefixes
+        })
+        levels = [n for n in levels if 2 <= n < len(tokens)]
+        if not levels:
+            return
+
+        current = self.llm._input_ids.tolist() if self.llm.n_tokens else []
+        if _common_prefix(current, tokens) >= levels[-1]:
+            return                                       # already in the KV cache
+
+        pos = 0
+        for n in reversed(levels):
+            state = self.prefix_cache.get(PrefixStateCache.key(self._model_id, tokens[:n]))
+            if state is not None:
+                self.llm.load_state(state)
+                pos = n
+                break
+        if pos == 0:
+            self.llm.reset()
+
+        for n in levels:
+            if n <= pos:
+                continue
+            self.llm.eval(tokens[pos:n])
+            self.prefix_cache.put(PrefixStateCache.key(self._model_id, tokens[:n]),
+                                  self.llm.save_state())
+            pos = n
 
     # generator that yields partial tokens
-    def stream(self, prompt, **kw):
-        for chunk in self.llm(prompt, stream=True, **kw):
-            yield chunk["choices"][0]["text"]
+    def stream(self, prompt, cache_prefix=None, **kw):
+        if self.prefix_cache is not None and cache_prefix:
+            tokens = self.llm.tokenize(prompt.encode("utf-8"), add_bos=True, special=True)
+            self._restore_prefix(tokens, cache_prefix)
+            prompt = tokens
+        if self.draft is None:
+            for chunk in self.llm(prompt, stream=True, **kw):
+                yield chunk["choices"][0]["text"]
+            return
+
+        first = None
+        self.draft.start()
+        try:
+            for chunk in self.llm(prompt, stream=True, **kw):
+                if first is None:
+                    first = time.perf_counter()
+                yield chunk["choices"][0]["text"]
+        finally:
+            if first is not None:
+                self._decode_s += time.perf_counter() - first
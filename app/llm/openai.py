@@ -0,0 +1,116 @@
+"""
+Streaming client for OpenAI-compatible completion servers.
+
+Connections are kept alive in a pooled requests.Session shared by all
+threads.  A request is retried with backoff on connection errors, read
+timeouts and 429/5xx responses until its first token arrives, whether
+the failure hits before the response headers or while reading the
+stream; after the first token a failure is raised to the caller.
+*timeout* bounds each wait for data from the server (*connect_timeout*
+the connect), not the whole request.  Closing the generator (or setting
+*cancel*) closes the HTTP response, which makes servers such as vLLM
+abort the request.
+"""
+
+import json, time, contextlib
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS    = {429, 500, 502, 503, 504}
+CHARS_PER_TOKEN = 4           # rough BPE average for English text
+
+
+class _RetryableStatus(requests.HTTPError):
+    pass
+
+
+RETRYABLE = (requests.ConnectionError, requests.Timeout,
+             requests.exceptions.ChunkedEncodingError, _RetryableStatus)
+
+
+class OpenAIEngine:
+    def __init__(self, base_url="https://api.openai.com/v1", model="gpt-3.5-turbo-instruct",
+                 api_key=None, api="completions", timeout=60.0, connect_timeout=5.0,
+                 max_retries=2, backoff=0.5, pool_size=16, n_ctx=2048):
+        self.base_url        = base_url.rstrip("/")
+        self.model           = model
+        self.api             = api                     # "completions" | "chat"
+        self.timeout         = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries     = max_retries
+        self.backoff         = backoff
+        self.n_ctx           = n_ctx
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def count_tokens(self, text):
+        """
+        Estimate only: the server's tokenizer is not available locally and a
+        round trip per chunk would cost more than the prefill it saves.
+        """
+        return -(-len(text) // CHARS_PER_TOKEN)
+
+    def _request(self, prompt, kw):
+        """One attempt: the streaming response, or RETRYABLE / HTTPError."""
+        payload = {"model": self.model, "stream": True, **kw}
+        if self.api == "chat":
+            payload["messages"] = [{"role": "user", "content": prompt}]
+            url = f"{self.base_url}/chat/completions"
+        else:
+            payload["prompt"] = prompt
+            url = f"{self.base_url}/completions"
+
+        resp = self.session.post(url, json=payload, stream=True,
+                                 timeout=(self.connect_timeout, self.timeout))
+        if resp.status_code in RETRY_STATUS:
+            resp.close()
+            raise _RetryableStatus(f"{resp.status_code} from {url}")
+        try:
+            resp.raise_for_status()
+        except requests.HTTPError:
+            resp.close()
+            raise
+        return resp
+
+    def _text(self, chunk):
+        choice = chunk["choices"][0]
+        if self.api == "chat":
+            return (choice.get("delta") or {}).get("content") or ""
+        return choice.get("text") or ""
+
+    def _tokens(self, resp, cancel):
+        for line in resp.iter_lines(decode_unicode=True):
+            if cancel is not None and cancel.is_set():
+                return
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                return
+            text = self._text(json.loads(data))
+            if text:
+                yield text
+
+    # generator that yields partial tokens
+    def stream(self, prompt, cancel=None, cache_prefix=None, **kw):
+        # cache_prefix is accepted for interface parity; the server does its own prefix caching
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                with contextlib.closing(self._request(prompt, kw)) as resp:
+                    for text in self._tokens(resp, cancel):
+                        started = True
+                        yield text
+                return
+            except RETRYABLE:
+                if started or attempt == self.max_retries:
+                    raise
+            time.sleep(delay)
+            delay *= 2
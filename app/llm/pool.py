@@ -0,0 +1,124 @@
+"""
+Pool of engine workers behind a FIFO request queue.
+
+A llama.cpp ``Llama`` object is not thread-safe, so each worker owns its
+own instance (weights are mmapped and shared by the OS; each worker only
+adds its own KV cache).  ``stream`` waits for a free worker in arrival
+order, streams from it and hands it to the next waiter when the generator
+finishes or is closed.  ``stream_background`` is for work nobody is
+waiting on (conversation summaries): it gets a worker only when no
+``stream`` caller is queued and stays out of the latency numbers.  Every
+``stats_every`` streams the pool prints its queue-wait and
+time-to-first-token percentiles (``stats()``).
+"""
+
+import time, json, threading
+from collections import deque
+
+STATS_EVERY = 50              # streams between "Engine pool:" log lines (0 = never)
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"p50": None, "p95": None, "max": None}
+    s = sorted(samples)
+    return {
+        "p50": round(s[len(s) // 2] * 1000, 1),
+        "p95": round(s[min(len(s) - 1, int(len(s) * 0.95))] * 1000, 1),
+        "max": round(s[-1] * 1000, 1),
+    }
+
+
+class EnginePool:
+    def __init__(self, factory, workers=1, window=1_000, stats_every=STATS_EVERY):
+        self.workers  = [factory() for _ in range(max(1, workers))]
+        self._free    = deque(self.workers)
+        self._waiters = deque()                     # FIFO of [Event, worker]
+        self._idlers  = deque()                     # background waiters, served last
+        self._lock    = threading.Lock()
+        self._wait_s  = deque(maxlen=window)        # queue-wait samples (s)
+        self._ttft_s  = deque(maxlen=window)        # time-to-first-token samples (s)
+        self.n_ctx    = getattr(self.workers[0], "n_ctx", None)
+        self.stats_every = stats_every
+        self._streams    = 0
+
+    def count_tokens(self, text):
+        # tokenizing only reads the vocabulary, so any worker will do even while busy
+        return self.workers[0].count_tokens(text)
+
+    def _acquire(self, background=False):
+        with self._lock:
+            if self._free and not self._waiters and not (background and self._idlers):
+                return self._free.popleft()
+            ticket = [threading.Event(), None]
+            (self._idlers if background else self._waiters).append(ticket)
+        ticket[0].wait()
+        return ticket[1]
+
+    def _release(self, worker):
+        with self._lock:
+            if self._waiters or self._idlers:
+                ticket = (self._waiters or self._idlers).popleft()
+                ticket[1] = worker
+                ticket[0].set()
+            else:
+                self._free.append(worker)
+
+    def stream(self, prompt, **kw):
+        queued = time.perf_counter()
+        worker = self._acquire()
+        started = time.perf_counter()
+        self._wait_s.append(started - queued)
+        try:
+            first = True
+            for tok in worker.stream(prompt, **kw):
+                if first:
+                    self._ttft_s.append(time.perf_counter() - queued)
+                    first = False
+                yield tok
+        finally:
+            self._release(worker)
+            self._log_stats()
+
+    def stream_background(self, prompt, **kw):
+        """Like stream, but yields the queue to every stream() caller."""
+        worker = self._acquire(background=True)
+        try:
+            yield from worker.stream(prompt, **kw)
+        finally:
+            self._release(worker)
+
+    def _log_stats(self):
+        with self._lock:
+            self._streams += 1
+            due = self.stats_every and self._streams % self.stats_every == 0
+        if due:
+            print(f"Engine pool: {json.dumps(self.stats())}")
+
+    def stats(self):
+        """Queue and latency numbers (milliseconds) over the recent window."""
+        with self._lock:
+            free, queued, idle = len(self._free), len(self._waiters), len(self._idlers)
+        stats = {
+            "workers":       len(self.workers),
+            "busy":          len(self.workers) - free,
+            "queued":        queued,
+            "queued_background": idle,
+            "queue_wait_ms": _percentiles(list(self._wait_s)),
+            "ttft_ms":       _percentiles(list(self._ttft_s)),
+        }
+        spec = [w.spec_stats() for w in self.workers if getattr(w, "spec_stats", None)]
+        spec = [s for s in spec if s]
+        if spec:
+            verified = sum(s["verified"] for s in spec)
+            accepted = sum(s["accepted"] for s in spec)
+            stats["speculative"] = {
+                "proposed":        sum(s["proposed"] for s in spec),
+                "verified":        verified,
+                "accepted":        accepted,
+                "acceptance_rate": round(accepted / verified, 3) if verified else None,
+            }
+        cache = getattr(self.workers[0], "prefix_cache", None)   # shared by all workers
+        if cache is not None:
+            stats["prefix_cache"] = {"hits": cache.hits, "misses": cache.misses}
+        return stats
@@ -0,0 +1,73 @@
+"""
+Minimal OpenAI-compatible streaming server for local testing.
+
+    python -m app.llm.stub_server --port 8000
+
+Answers POST /v1/completions and /v1/chat/completions with a
+deterministic stream that echoes the last prompt line word by word.
+"""
+
+import json, time, argparse, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _reply_words(prompt):
+    lines = [l for l in prompt.strip().splitlines() if l.strip()]
+    last  = lines[-1] if lines else ""
+    return f"Stub answer to: {last}".split()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    token_delay      = 0.0
+
+    def do_POST(self):
+        if self.path.rstrip("/") not in ("/v1/completions", "/v1/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        chat = "messages" in body
+        prompt = body["messages"][-1]["content"] if chat else body.get("prompt", "")
+        words = _reply_words(prompt)[: body.get("max_tokens") or None]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, word in enumerate(words):
+                text = word if i == 0 else " " + word
+                choice = {"index": 0, "delta": {"content": text}} if chat else {"index": 0, "text": text}
+                self._chunk(f"data: {json.dumps({'choices': [choice]})}\n\n")
+                time.sleep(self.token_delay)
+            self._chunk("data: [DONE]\n\n")
+            self._chunk("")
+        except (BrokenPipeError, ConnectionResetError):
+            pass                                       # client cancelled
+
+    def _chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+def start(host="127.0.0.1", port=0, token_delay=0.0):
+    """Start the stub in a daemon thread; returns the server (see .server_port)."""
+    handler = type("Handler", (_Handler,), {"token_delay": token_delay})
+    server  = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+    server = start(args.host, args.port, args.token_delay)
+    print(f"Stub server on http://{args.host}:{server.server_port}/v1")
+    threading.Event().wait()
@@ -0,0 +1,8 @@
+"""vLLM back-end: its OpenAI-compatible server batches requests server-side."""
+
+from .openai import OpenAIEngine
+
+
+class VLLMEngine(OpenAIEngine):
+    def __init__(self, base_url="http://localhost:8000/v1", model="mistral", **kw):
+        super().__init__(base_url=base_url, model=model, **kw)
@@ -0,0 +1,118 @@
+"""
+Per-session conversation memory for the chat prompt.
+
+The block rendered into each prompt is a rolling summary of the older
+exchanges plus the last exchange verbatim, so its size stays bounded no
+matter how long the conversation runs.  Summaries are folded forward one
+exchange at a time on a background thread; a turn never waits for one and
+simply renders the newest summary available.  The summarizer in
+app.chatbot asks the engine pool at low priority, so folding only uses a
+worker no live answer is queued for.  The rendered block is
+cached per session and rebuilt only when the summary or the last exchange
+changes.
+"""
+
+import hashlib, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_SESSIONS   = 1_000
+VERBATIM_CHARS = 1_000        # cap on each side of the verbatim exchange (~250 tokens)
+
+
+def exchanges(history):
+    """(question, answer) pairs from a role/content message list."""
+    pairs, user_msg = [], None
+    for item in history or []:
+        if not (isinstance(item, dict) and "role" in item and "content" in item):
+            continue
+        if item["role"] == "user":
+            user_msg = item["content"]
+        elif item["role"] == "assistant" and item["content"].strip() and user_msg:
+            pairs.append((user_msg, item["content"]))
+            user_msg = None
+    return pairs
+
+
+def _clip(text):
+    text = text.strip()
+    return text if len(text) <= VERBATIM_CHARS else text[:VERBATIM_CHARS].rstrip() + "…"
+
+
+def _digest(pairs):
+    h = hashlib.sha1()
+    for q, a in pairs:
+        h.update(q.encode("utf-8") + b"\0" + a.encode("utf-8") + b"\0")
+    return h.hexdigest()
+
+
+class _Session:
+    __slots__ = ("summary", "covered", "digest", "pending", "rendered")
+
+    def __init__(self):
+        self.summary  = ""
+        self.covered  = 0             # exchanges folded into the summary
+        self.digest   = _digest([])   # of those exchanges, to notice edited histories
+        self.pending  = False
+        self.rendered = (None, "")    # (cache key, block)
+
+
+class ConversationMemory:
+    def __init__(self, summarize, max_sessions=MAX_SESSIONS):
+        """*summarize(summary, question, answer)* returns the updated summary."""
+        self.summarize    = summarize
+        self.max_sessions = max_sessions
+        self._sessions    = OrderedDict()
+        self._lock        = threading.Lock()
+        self._worker      = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory")
+
+    def _session(self, session_id):
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = self._sessions[session_id] = _Session()
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return state
+
+    def render(self, session_id, history):
+        """Memory block for the prompt; schedules summarising of older exchanges."""
+        pairs = exchanges(history)
+        if not pairs:
+            return ""
+        state = self._session(session_id)
+        older = pairs[:-1]
+
+        with self._lock:
+            if state.covered > len(older) or _digest(older[:state.covered]) != state.digest:
+                state.summary, state.covered, state.digest = "", 0, _digest([])   # history was reset
+            if state.covered < len(older) and not state.pending:
+                state.pending = True
+                self._worker.submit(self._fold, state, older)
+            summary = state.summary
+
+        q, a = pairs[-1]
+        key  = (summary, q, a)
+        if state.rendered[0] == key:
+            return state.rendered[1]
+        block = f"Conversation so far: {summary}\n" if summary else ""
+        block += f"User: {_clip(q)}\nAssistant: {_clip(a)}\n"
+        state.rendered = (key, block)
+        return block
+
+    def _fold(self, state, older):
+        try:
+            summary = state.summary
+            for i in range(state.covered, len(older)):
+                summary = self.summarize(summary, *older[i])
+                with self._lock:
+                    if state.covered != i:
+                        return                         # reset meanwhile; next turn reschedules
+                    state.summary, state.covered = summary, i + 1
+                    state.digest = _digest(older[:i + 1])
+        except Exception as e:
+            print(f"Error summarising conversation: {e}")
+        finally:
+            with self._lock:
+                state.pending = False
@@ -0,0 +1,255 @@
+"""
+Process-local request metrics in Prometheus text format.
+
+    with metrics.span("retrieval"):          # -> chatbot_stage_seconds{stage="retrieval"}
+        ...
+    metrics.inc("chatbot_cache_total", tier="semantic", result="hit")
+    metrics.observe("chatbot_prompt_tokens", 812, buckets=TOKEN_BUCKETS)
+
+``render()`` produces the /metrics page.  With METRICS_ENABLED off every
+call returns immediately and ``span`` hands back a shared no-op context.
+
+Gauges owned by other components (engine pool queue, speculative
+decoding, prefix cache) are read when the page is rendered from the
+functions registered with ``collector``.
+
+Slow-request profiling: with PROFILE_SLOW_MS > 0, ``profile()`` samples
+the calling thread's stack every PROFILE_INTERVAL_MS from one shared
+sampler thread and, when the request took longer than the threshold,
+writes the samples as collapsed stacks (flamegraph.pl / speedscope
+input) to data/profiles/.  ``profiled(gen)`` does the same for a
+generator, following it to whichever thread resumes it.
+"""
+
+import sys, time, pathlib, threading, contextlib
+from collections import Counter
+
+from app.config import METRICS_ENABLED, PROFILE_SLOW_MS, PROFILE_INTERVAL_MS
+
+TIME_BUCKETS  = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+PROFILE_DIR   = pathlib.Path(__file__).resolve().parents[1] / "data" / "profiles"
+
+_lock       = threading.Lock()
+_counters   = {}              # (name, labels) -> value
+_histograms = {}              # (name, labels) -> [bucket counts..., sum, count]
+_buckets    = {}              # name -> bucket bounds
+_collectors = []              # callables read by render()
+_NULL       = contextlib.nullcontext()
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    if not METRICS_ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, buckets=TIME_BUCKETS, **labels):
+    if not METRICS_ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        bounds = _buckets.setdefault(name, buckets)
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(bounds) + 2)
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                h[i] += 1
+                break
+        h[-2] += value
+        h[-1] += 1
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe("chatbot_stage_seconds", time.perf_counter() - self.start, stage=self.stage)
+        return False
+
+
+def span(stage):
+    """Time the enclosed block into chatbot_stage_seconds{stage=...}."""
+    return _Span(stage) if METRICS_ENABLED else _NULL
+
+
+def collector(fn):
+    """
+    Register *fn*, called on every render(); it returns samples as
+    (name, "gauge" | "counter", {labels}, value).
+    """
+    _collectors.append(fn)
+    return fn
+
+
+def _collected():
+    samples = {}
+    for fn in list(_collectors):
+        try:
+            for name, kind, labels, value in fn():
+                samples.setdefault((name, kind), []).append((_labels(labels), value))
+        except Exception as e:
+            print(f"Error collecting metrics from {getattr(fn, '__name__', fn)}: {e}")
+    return samples
+
+
+def _fmt(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def render():
+    """All metrics in Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        counters   = dict(_counters)
+        histograms = {k: list(v) for k, v in _histograms.items()}
+    lines = []
+    for name in sorted({n for n, _ in counters}):
+        lines.append(f"# TYPE {name} counter")
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{name}{_fmt(labels)} {value}")
+    for name in sorted({n for n, _ in histograms}):
+        lines.append(f"# TYPE {name} histogram")
+        bounds = _buckets[name]
+        for (n, labels), h in sorted(histograms.items()):
+            if n != name:
+                continue
+            running = 0
+            for bound, count in zip(bounds, h):
+                running += count
+                lines.append(f"{name}_bucket{_fmt(labels, [('le', bound)])} {running}")
+            lines.append(f"{name}_bucket{_fmt(labels, [('le', '+Inf')])} {h[-1]}")
+            lines.append(f"{name}_sum{_fmt(labels)} {h[-2]}")
+            lines.append(f"{name}_count{_fmt(labels)} {h[-1]}")
+    if METRICS_ENABLED:
+        for (name, kind), samples in sorted(_collected().items()):
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(samples):
+                lines.append(f"{name}{_fmt(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ─────────────────────────────────────────────
+# sampling profiler for slow requests
+# ─────────────────────────────────────────────
+class _Sampler:
+    def __init__(self, interval):
+        self.interval = interval
+        self.active   = {}                    # thread id -> Counter of collapsed stacks
+        self.lock     = threading.Lock()
+        threading.Thread(target=self._run, daemon=True, name="profile-sampler").start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.active:
+                    continue
+                frames = sys._current_frames()
+                for tid, stacks in self.active.items():
+                    frame, stack = frames.get(tid), []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({pathlib.Path(code.co_filename).name}:{frame.f_lineno})")
+                        frame = frame.f_back
+                    if stack:
+                        stacks[";".join(reversed(stack))] += 1
+
+
+_sampler      = None
+_sampler_lock = threading.Lock()
+
+
+class _Profile:
+    """Samples of one request; attach() the thread running it, possibly a different one each step."""
+
+    def __init__(self, name):
+        global _sampler
+        if _sampler is None:
+            with _sampler_lock:
+                if _sampler is None:
+                    _sampler = _Sampler(PROFILE_INTERVAL_MS / 1000)
+        self.name   = name
+        self.stacks = Counter()
+        self.tid    = None
+        self.start  = time.perf_counter()
+
+    def attach(self):
+        self.tid = threading.get_ident()
+        with _sampler.lock:
+            _sampler.active[self.tid] = self.stacks
+
+    def detach(self):
+        with _sampler.lock:
+            if _sampler.active.get(self.tid) is self.stacks:
+                _sampler.active.pop(self.tid)
+
+    def finish(self):
+        self.detach()
+        elapsed = (time.perf_counter() - self.start) * 1000
+        if elapsed >= PROFILE_SLOW_MS and self.stacks:
+            try:
+                PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+                path = PROFILE_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{self.name}-{int(elapsed)}ms.txt"
+                path.write_text("".join(f"{s} {n}\n" for s, n in self.stacks.most_common()),
+                                encoding="utf-8")
+                inc("chatbot_slow_requests_total")
+            except Exception as e:
+                print(f"Error writing profile: {e}")
+
+
+@contextlib.contextmanager
+def _profiled(name):
+    prof = _Profile(name)
+    prof.attach()
+    try:
+        yield
+    finally:
+        prof.finish()
+
+
+def _profiled_iter(gen, name):
+    prof = _Profile(name)
+    try:
+        while True:
+            prof.attach()                     # servers may resume a generator on any thread
+            try:
+                item = next(gen)
+            except StopIteration:
+                return
+            finally:
+                prof.detach()
+            yield item
+    finally:
+        gen.close()
+        prof.finish()
+
+
+def profile(name="request"):
+    """Sample the current thread while the block runs; dump it if it was slow."""
+    return _profiled(name) if PROFILE_SLOW_MS > 0 else _NULL
+
+
+def profiled(gen, name="request"):
+    """
+    Iterate *gen*, sampling whichever thread runs each step (Gradio resumes
+    a streaming handler on different worker threads); dump it if it was slow.
+    """
+    return _profiled_iter(gen, name) if PROFILE_SLOW_MS > 0 else gen
@@ -0,0 +1,282 @@
+"""
+Local model server: one process per machine owns the LLM engine, the
+embedding model and the vector store, and the chat front ends (Gradio UI,
+Flask/ASGI API, email agent) talk to it over a Unix socket.
+
+    python -m app.model_server --socket data/model_server.sock
+    MODEL_SERVER_SOCKET=data/model_server.sock python run_chatbot.py
+
+With MODEL_SERVER_SOCKET set, app.resources builds the clients below
+instead of loading models, so every process shares one copy of the
+weights, the engine pool's scheduler and the embedder's micro-batcher.
+
+Protocol: newline-delimited JSON over a persistent connection.  Each
+request is one line {"op": ..., ...}; the reply is zero or more
+{"token": ...} lines followed by a final line carrying "done": true (and
+"error" when the op failed).  float32 arrays travel as
+{"shape": [...], "data": base64}.  Closing the connection mid-stream
+stops the generation.
+"""
+
+import os, sys, json, socket, base64, argparse, threading, contextlib, socketserver
+from functools import lru_cache
+
+import numpy as np
+
+DEFAULT_SOCKET = "data/model_server.sock"
+POOL_SIZE      = 8            # idle client connections kept per process
+
+
+def _pack(arr):
+    arr = np.ascontiguousarray(arr, dtype=np.float32)
+    return {"shape": list(arr.shape), "data": base64.b64encode(arr.tobytes()).decode("ascii")}
+
+
+def _unpack(obj):
+    return np.frombuffer(base64.b64decode(obj["data"]), dtype=np.float32).reshape(obj["shape"])
+
+
+# ─────────────────────────────────────────────
+# server
+# ─────────────────────────────────────────────
+def _info(req):
+    from app import resources
+    yield {"dim": resources.get("embedder").dim, "n_ctx": resources.get("engine").n_ctx}
+
+
+def _encode(req):
+    from app import resources
+    yield {"vectors": _pack(resources.get("embedder").encode(req["texts"]))}
+
+
+def _encode_query(req):
+    from app import resources
+    yield {"vector": _pack(resources.get("embedder").encode_query(req["text"]))}
+
+
+def _count_tokens(req):
+    from app import resources
+    engine = resources.get("engine")
+    yield {"counts": [engine.count_tokens(t) for t in req["texts"]]}
+
+
+def _stream(req):
+    from app import resources
+    engine = resources.get("engine")
+    stream = getattr(engine, "stream_background", engine.stream) if req.get("background") else engine.stream
+    with contextlib.closing(stream(req["prompt"], **req.get("kw", {}))) as tokens:
+        for tok in tokens:
+            yield {"token": tok}
+
+
+def _search(req):
+    from app import resources
+    hits = resources.get("vector_store").search(req["collection"], _unpack(req["embedding"]), req["k"])
+    vecs = np.stack([h["vector"] for h in hits]) if hits else np.zeros((0, 0), dtype=np.float32)
+    yield {"hits": [{"id": h["id"], "document": h["document"], "score": float(h["score"])} for h in hits],
+           "vectors": _pack(vecs)}
+
+
+def _upsert(req):
+    from app import resources
+    store = resources.get("vector_store")
+    yield {"stats": store.upsert(req["collection"], req["docs"],
+                                 resources.get("embedder").encode, req["batch_size"])}
+
+
+OPS = {
+    "info":         _info,
+    "encode":       _encode,
+    "encode_query": _encode_query,
+    "count_tokens": _count_tokens,
+    "stream":       _stream,
+    "search":       _search,
+    "upsert":       _upsert,
+}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _send(self, msg):
+        self.wfile.write(json.dumps(msg).encode("utf-8") + b"\n")
+
+    def handle(self):
+        try:
+            for line in self.rfile:
+                req = json.loads(line)
+                try:
+                    with contextlib.closing(OPS[req["op"]](req)) as replies:
+                        last = {}
+                        for msg in replies:
+                            if "token" in msg:
+                                self._send(msg)
+                            else:
+                                last = msg
+                    self._send({**last, "done": True})
+                except (BrokenPipeError, ConnectionResetError):
+                    raise
+                except Exception as e:
+                    self._send({"error": f"{type(e).__name__}: {e}", "done": True})
+        except (BrokenPipeError, ConnectionResetError):
+            pass                                       # client went away, generation closed
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def serve(path=DEFAULT_SOCKET):
+    from app import resources
+    resources.use_local()
+    print(f"Warmed up: {resources.warmup(['engine', 'embedder', 'vector_store'])}")
+
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            sys.exit(f"A model server is already listening on {path}")
+        except OSError:
+            os.unlink(path)                            # stale socket from a crashed run
+        finally:
+            probe.close()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with _Server(path, _Handler) as server:
+        os.chmod(path, 0o600)
+        print(f"Model server listening on {path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+
+
+# ─────────────────────────────────────────────
+# clients (used by app.resources when MODEL_SERVER_SOCKET is set)
+# ─────────────────────────────────────────────
+def _close(conn):
+    conn[1].close()
+    conn[0].close()
+
+
+class ModelClient:
+    """Connection pool to the model server; one request per connection at a time."""
+
+    def __init__(self, path, pool_size=POOL_SIZE):
+        self.path      = path
+        self.pool_size = pool_size
+        self._idle     = []
+        self._lock     = threading.Lock()
+
+    def _checkout(self, payload):
+        """A connection with *payload* sent on it; idle ones the server dropped are replaced."""
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            pooled = conn is not None
+            if not pooled:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.path)
+                conn = (sock, sock.makefile("rb"))
+            try:
+                conn[0].sendall(payload)
+                return conn
+            except OSError:
+                _close(conn)
+                if not pooled:
+                    raise
+
+    def _checkin(self, conn):
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                return
+        _close(conn)
+
+    def messages(self, op, **args):
+        """Send one request and yield its reply lines, the final "done" line included."""
+        conn     = self._checkout(json.dumps({"op": op, **args}).encode("utf-8") + b"\n")
+        reusable = False
+        try:
+            while True:
+                line = conn[1].readline()
+                if not line:
+                    raise ConnectionError(f"model server at {self.path} closed the connection")
+                msg = json.loads(line)
+                if msg.get("done"):
+                    reusable = True
+                    if "error" in msg:
+                        raise RuntimeError(f"model server: {msg['error']}")
+                yield msg
+                if reusable:
+                    return
+        finally:
+            # a stream abandoned half way cannot be reused; closing it stops the generation
+            if reusable:
+                self._checkin(conn)
+            else:
+                _close(conn)
+
+    def call(self, op, **args):
+        with contextlib.closing(self.messages(op, **args)) as replies:
+            return next(replies)
+
+
+class RemoteEngine:
+    def __init__(self, client):
+        self.client = client
+        self.n_ctx  = client.call("info")["n_ctx"]
+        self.count_tokens = lru_cache(maxsize=4096)(self._count_tokens)
+
+    def _count_tokens(self, text):
+        return self.client.call("count_tokens", texts=[text])["counts"][0]
+
+    def stream(self, prompt, cancel=None, background=False, **kw):
+        with contextlib.closing(self.client.messages("stream", prompt=prompt, kw=kw,
+                                                     background=background)) as replies:
+            for msg in replies:
+                if cancel is not None and cancel.is_set():
+                    return
+                if "token" in msg:
+                    yield msg["token"]
+
+    def stream_background(self, prompt, **kw):
+        return self.stream(prompt, background=True, **kw)
+
+
+class RemoteEmbedder:
+    def __init__(self, client):
+        self.client = client
+        self.dim    = client.call("info")["dim"]
+
+    def encode(self, texts):
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return _unpack(self.client.call("encode", texts=list(texts))["vectors"])
+
+    def encode_query(self, text):
+        return _unpack(self.client.call("encode_query", text=text)["vector"])
+
+
+class RemoteVectorStore:
+    """Vector store on the model server; *embed* is ignored, the server embeds."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def upsert(self, collection, docs, embed=None, batch_size=256):
+        return self.client.call("upsert", collection=collection, docs=docs,
+                                batch_size=batch_size)["stats"]
+
+    def search(self, collection, embedding, k):
+        reply = self.client.call("search", collection=collection,
+                                 embedding=_pack(embedding), k=k)
+        vecs  = _unpack(reply["vectors"])
+        return [dict(hit, vector=vec) for hit, vec in zip(reply["hits"], vecs)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the models to the chat front ends.")
+    parser.add_argument("--socket", default=os.getenv("MODEL_SERVER_SOCKET") or DEFAULT_SOCKET,
+                        help=f"Unix socket path (default $MODEL_SERVER_SOCKET or {DEFAULT_SOCKET})")
+    serve(parser.parse_args().socket)
@@ -0,0 +1,22 @@
+"""Prompt text shared by the chat pipeline and its benchmarks."""
+
+# Static start of every RAG prompt; the engine snapshots its KV state once
+# and only evaluates what follows for each request.
+PROMPT_PREFIX = """
+You are a friendly, professional assistant for NileEdge Innovations, a company offering AI solutions, data science, automation, and digital transformation.
+
+Use the information in the "Context" section as your primary source. If the context is not enough, use your general knowledge and recent conversation history to assist the user, but stay polite and avoid fabricating facts about the company.
+
+Context:
+"""
+
+# Folds one exchange into the rolling conversation summary (app.memory).
+SUMMARY_PROMPT = """Update the running summary of a customer conversation with the newest exchange.
+Keep names, requirements and open questions; drop greetings and filler. Answer with the summary only, at most 60 words.
+
+Summary so far: {summary}
+
+User: {question}
+Assistant: {answer}
+
+Updated summary:"""
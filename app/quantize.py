@@ -0,0 +1,72 @@
+"""
+Compact codes for normalised embedding vectors.
+
+int8    one signed byte per dimension plus a float32 scale per vector
+        (4x smaller than float32; cosine error around 1e-3)
+binary  one sign bit per dimension (32x smaller); similarity from the
+        Hamming distance, only good enough to shortlist candidates
+
+Searches scan the compact codes for a shortlist and rerank it with a more
+exact representation (int8 codes or the float32 rows), so recall stays at
+the float32 level while the resident scan data shrinks.  The saving is
+memory, not time: the int8 scan has no BLAS path and runs about 2x
+slower than a float32 matmul (bench/quantization.py); binary is about
+as fast as float32.
+"""
+
+import numpy as np
+
+MODES = ("none", "int8", "binary")
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def quantize_int8(vecs):
+    """(codes int8 (n, dim), scales float32 (n,)) with vec ~= codes * scale."""
+    vecs   = np.atleast_2d(np.asarray(vecs, dtype=np.float32))
+    scales = np.abs(vecs).max(axis=1) / 127
+    scales[scales == 0] = 1.0
+    codes  = np.rint(vecs / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def pack_signs(vecs):
+    """Sign bits of *vecs* (floats or int8 codes), packed 8 per byte."""
+    return np.packbits(np.atleast_2d(np.asarray(vecs)) > 0, axis=-1)
+
+
+def int8_scores(codes, scales, query):
+    # einsum accumulates int8 x float32 in place; "@" would first cast the whole matrix
+    return np.einsum("ij,j->i", codes, np.asarray(query, dtype=np.float32)) * scales
+
+
+def hamming_scores(bits, query_bits, dim):
+    """Approximate cosine from sign agreement: 1 - 2 * hamming / dim."""
+    if bits.shape[1] % 8 == 0 and bits.flags.c_contiguous and hasattr(np, "bitwise_count"):
+        # 64 dimensions per XOR / popcount (numpy >= 2.0)
+        words    = bits.view(np.uint64) ^ np.ascontiguousarray(query_bits).view(np.uint64)
+        distance = np.bitwise_count(words).sum(axis=1, dtype=np.int32)
+    else:
+        distance = _POPCOUNT[bits ^ query_bits].sum(axis=1, dtype=np.int32)
+    return 1.0 - 2.0 * distance / dim
+
+
+def top_k(scores, k):
+    """Indices of the *k* largest *scores*, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def shortlist(mode, query, k, rerank, codes=None, scales=None, bits=None):
+    """
+    Candidate rows for *query*: the top *rerank* rows of the coarse scan
+    (Hamming for binary, int8 dot products for int8).
+    """
+    if mode == "binary":
+        coarse = hamming_scores(bits, pack_signs(query)[0], len(query))
+    else:
+        coarse = int8_scores(codes, scales, query)
+    return top_k(coarse, max(k, rerank))
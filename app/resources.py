@@ -0,0 +1,102 @@
+"""
+Lazily built, process-wide resources.
+
+Importing app modules constructs nothing heavy: the LLM engine, the
+sentence-embedding model and the vector store are built on the first
+``get`` that needs them, exactly once per process.  Servers call
+``warmup()`` before accepting traffic so the first request does not pay
+for loading.
+
+    engine = resources.get("engine")
+
+With MODEL_SERVER_SOCKET set, "engine", "embedder" and "vector_store" are
+clients of the model server daemon (app.model_server) listening on that
+Unix socket instead of local models.
+"""
+
+import os, time, threading
+
+_factories = {}
+_instances = {}
+_locks     = {}
+_lock      = threading.Lock()
+
+
+def register(name, factory):
+    """Make *factory()* the builder for *name* (replaces any unbuilt registration)."""
+    with _lock:
+        _factories[name] = factory
+        _locks.setdefault(name, threading.Lock())
+
+
+def get(name):
+    try:
+        return _instances[name]
+    except KeyError:
+        pass
+    with _lock:
+        factory, lock = _factories[name], _locks[name]
+    # per-name lock: loading the engine does not block the embedder
+    with lock:
+        if name not in _instances:
+            _instances[name] = factory()
+    return _instances[name]
+
+
+def override(name, instance):
+    """Use *instance* for *name* from now on (benchmarks, alternative back-ends)."""
+    with _lock:
+        _factories[name] = lambda: instance
+        _locks.setdefault(name, threading.Lock())
+        _instances[name] = instance
+
+
+def loaded(name):
+    return name in _instances
+
+
+def warmup(names=None):
+    """Build *names* (default: everything registered); returns load seconds per name."""
+    timings = {}
+    for name in names or list(_factories):
+        start = time.perf_counter()
+        get(name)
+        timings[name] = round(time.perf_counter() - start, 3)
+    return timings
+
+
+def _engine():
+    from app.llm import get_engine
+    return get_engine()
+
+
+def _embedder():
+    from app.embeddings import get_embedder
+    return get_embedder()
+
+
+def _vector_store():
+    from app.config import VECTOR_BACKEND, VECTOR_DTYPE, VECTOR_QUANTIZATION
+    from app.vectorstores import get_store
+    return get_store(VECTOR_BACKEND, dtype=VECTOR_DTYPE, quantization=VECTOR_QUANTIZATION)
+
+
+def use_local():
+    """Build the engine, embedder and vector store in this process."""
+    register("engine", _engine)
+    register("embedder", _embedder)
+    register("vector_store", _vector_store)
+
+
+def use_model_server(path):
+    """Route the engine, embedder and vector store to the model server at *path*."""
+    from app.model_server import ModelClient, RemoteEngine, RemoteEmbedder, RemoteVectorStore
+    client = ModelClient(path)
+    register("engine", lambda: RemoteEngine(client))
+    register("embedder", lambda: RemoteEmbedder(client))
+    register("vector_store", lambda: RemoteVectorStore(client))
+
+
+use_local()
+if os.getenv("MODEL_SERVER_SOCKET"):
+    use_model_server(os.getenv("MODEL_SERVER_SOCKET"))
@@ -0,0 +1,216 @@
+"""
+Two-tier cache of generated answers.
+
+exact     dict lookup on the normalised question - runs before anything
+          is embedded, so a repeated question costs one hash
+semantic  nearest cached question in the FAQ index ("faq_index"
+          resource), served above a cosine threshold
+
+Entries are journaled as
+    {answer, timestamp, created, kb_version, sources, hits}
+where *sources* are the ids (content hashes) of the chunks that went
+into the prompt.  When refresh_kb publishes a new KB version, entries
+whose sources were removed or changed are dropped and the rest are
+re-tagged; an answer built without retrieved chunks cannot be checked
+and is dropped on any KB change.  Entries with no *sources* field at all
+(hand-written answers in data/faq_cache.json) are pinned: no KB change
+drops them.  An answer is tagged with the version its chunks were
+retrieved under (``kb_version()`` before retrieval), so a refresh that
+lands while it is being generated is checked at ``put``.  New pages do
+not invalidate anything - CACHE_TTL_HOURS bounds how long such an answer
+can miss them.
+
+One re-entrant lock guards the entries: request threads look up, hit and
+put concurrently.  The FAQ index is resolved before taking it, since
+loading the index iterates the cache.
+
+Eviction at the size limit follows CACHE_POLICY:
+    lru   least recently served
+    lfu   fewest hits
+    ttl   oldest answer
+"""
+
+import time, threading
+from collections import OrderedDict
+
+from app import resources, metrics
+from app.kb_state import KbState
+
+POLICIES = ("lru", "lfu", "ttl")
+_CURRENT = object()           # put() default: tag with the version seen now
+
+
+def cache_key(question: str) -> str:
+    """Exact-tier key: case, whitespace and trailing punctuation are ignored."""
+    return " ".join(question.lower().split()).rstrip(" ?!.")
+
+
+def _created(entry):
+    # entries written before "created" existed only carry the timestamp string
+    created = entry.get("created")
+    if created is None:
+        try:
+            created = time.mktime(time.strptime(entry.get("timestamp", ""), "%Y-%m-%d %H:%M:%S"))
+        except ValueError:
+            created = 0.0
+        entry["created"] = created
+    return created
+
+
+class ResponseCache:
+    def __init__(self, journal, limit, threshold, policy="lru", ttl_hours=0,
+                 kb_state=None, index="faq_index"):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown cache policy {policy!r}, expected one of {POLICIES}")
+        self.journal   = journal
+        self.entries   = journal.load() or OrderedDict()
+        self.limit     = limit
+        self.threshold = threshold
+        self.policy    = policy
+        self.ttl       = ttl_hours * 3600
+        self.kb        = kb_state or KbState()
+        self.index     = index                            # resource name of the FaqIndex
+        self._kb_seen  = self.kb.version()
+        self._lock     = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self.entries))
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    # ─────────────────────────────────────────
+    # lookups
+    # ─────────────────────────────────────────
+    def lookup(self, key):
+        """Exact tier: the answer cached under *key*, or None."""
+        self._check_kb()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or self._expired(key, entry):
+                return None
+            return self._hit(key, entry)
+
+    def match(self, query_vec):
+        """Semantic tier: answer of the closest cached question above the threshold."""
+        if not self.entries:
+            return None
+        self._check_kb()
+        key, sim = resources.get(self.index).search(query_vec)
+        if sim < self.threshold:
+            return None
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or self._expired(key, entry):
+                return None
+            return self._hit(key, entry)
+
+    def _expired(self, key, entry):
+        if self.ttl and time.time() - _created(entry) > self.ttl:
+            self.delete(key)
+            return True
+        return False
+
+    def _hit(self, key, entry):
+        entry["hits"] = entry.get("hits", 0) + 1
+        if self.policy == "lru":
+            self.entries.move_to_end(key)
+            self.journal.touch(key)
+        elif self.policy == "lfu":
+            self.journal.set(key, entry)                  # persist the hit count
+        return entry["answer"]
+
+    # ─────────────────────────────────────────
+    # updates
+    # ─────────────────────────────────────────
+    def put(self, key, answer, query_vec, sources=(), kb_version=_CURRENT):
+        """
+        Cache *answer*; *kb_version* is the KB version *sources* were
+        retrieved under (kb_version() taken before retrieval).
+        """
+        index = resources.get(self.index)
+        self._check_kb()
+        entry = {
+            "answer":     answer,
+            "timestamp":  time.strftime("%Y-%m-%d %H:%M:%S"),
+            "created":    time.time(),
+            "kb_version": self._kb_seen if kb_version is _CURRENT else kb_version,
+            "sources":    sorted(set(sources)),
+            "hits":       0,
+        }
+        with self._lock:
+            if entry["kb_version"] != self._kb_seen and not self._retag(entry, self._kb_seen):
+                metrics.inc("chatbot_cache_total", tier="kb", result="dropped")
+                return                                    # a refresh removed its chunks meanwhile
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            self.journal.set(key, entry)
+            index.add(key, query_vec)                     # uncased model: same vector as *key*
+            if self.ttl and len(self.entries) > self.limit:
+                now = time.time()
+                for old in [k for k, e in self.entries.items() if now - _created(e) > self.ttl]:
+                    self.delete(old)
+            while len(self.entries) > self.limit:
+                self.delete(self._victim(keep=key))
+
+    def delete(self, key):
+        with self._lock:
+            if self.entries.pop(key, None) is None:
+                return
+            self.journal.delete(key)
+            # an index that is not loaded yet is built from the entries left
+            if resources.loaded(self.index):
+                resources.get(self.index).remove(key)
+
+    def _victim(self, keep):
+        # *keep* is the entry just added: under lfu it would always lose with 0 hits
+        others = (k for k in self.entries if k != keep)
+        if self.policy == "lfu":
+            return min(others, key=lambda k: self.entries[k].get("hits", 0))
+        if self.policy == "ttl":
+            return min(others, key=lambda k: _created(self.entries[k]))
+        return next(others)
+
+    # ─────────────────────────────────────────
+    # knowledge-base versions
+    # ─────────────────────────────────────────
+    def kb_version(self):
+        """Current KB version; take it before retrieval and hand it to put()."""
+        self._check_kb()
+        return self._kb_seen
+
+    def _check_kb(self):
+        with self._lock:
+            version = self.kb.version()
+            if version != self._kb_seen:
+                self._kb_seen = version
+                self.invalidate(version)
+
+    def _retag(self, entry, version):
+        """Move *entry* to *version*; False when chunks it was built from are gone."""
+        removed = self.kb.removed_since(entry.get("kb_version"))
+        sources = entry.get("sources") or []
+        if removed is None or not sources or not removed.isdisjoint(sources):
+            return False
+        entry["kb_version"] = version
+        return True
+
+    def invalidate(self, version):
+        """Drop entries that depend on chunks removed since their version; re-tag the rest."""
+        dropped = kept = 0
+        with self._lock:
+            for key, entry in list(self.entries.items()):
+                if entry.get("kb_version") == version or "sources" not in entry:
+                    continue                              # current, or hand-written (pinned)
+                if self._retag(entry, version):
+                    self.journal.set(key, entry)
+                    kept += 1
+                else:
+                    self.delete(key)
+                    dropped += 1
+        metrics.inc("chatbot_cache_total", dropped, tier="kb", result="dropped")
+        metrics.inc("chatbot_cache_total", kept, tier="kb", result="kept")
@@ -1,31 +1,34 @@
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from sentence_transformers import SentenceTransformer
-from chromadb import PersistentClient
-from app.config import VECTOR_COLLECTION
+from app.config import VECTOR_COLLECTION, VECTOR_BATCH_SIZE
+from app.vectorstores import doc_id
+from app import resources
 
 os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 
-# Define where to persist the vector store
-PERSIST_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "chroma")
-os.makedirs(PERSIST_DIR, exist_ok=True)
 
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-db = PersistentClient(path=PERSIST_DIR)
+def update_vector_store(collection_name, docs, batch_size=VECTOR_BATCH_SIZE):
+    """
+    Rebuild *collection_name* from *docs*, embedding only chunks that are not
+    already indexed.  The store builds the new contents beside the live ones
+    and swaps them in atomically, so queries never see an empty or partial
+    index.  Returns diff counts.
+    """
+    wanted = {}
+    for text in docs:
+        wanted.setdefault(doc_id(text), text)
+    return resources.get("vector_store").upsert(collection_name, wanted,
+                                                resources.get("embedder").encode, batch_size)
 
-def update_vector_store(collection_name, docs):
-    if collection_name in [c.name for c in db.list_collections()]:
-        db.delete_collection(collection_name)
-    collection = db.get_or_create_collection(collection_name)
-    embeddings = embedder.encode(docs)
-    for i, text in enumerate(docs):
-        collection.add(documents=[text], embeddings=[embeddings[i]], ids=[str(i)])
 
-def query_vector_store(query, collection_name):
-    collection = db.get_or_create_collection(collection_name)
-    q_embed = embedder.encode([query])[0]
-    results = collection.query(query_embeddings=[q_embed], n_results=10)
-    docs = results.get("documents", [])
-    return docs[0] if docs and docs[0] else []
+def search(query, collection_name, k=10, query_embedding=None):
+    """Top-*k* chunks as dicts {id, document, score, vector}, best first."""
+    if query_embedding is None:
+        query_embedding = resources.get("embedder").encode_query(query)
+    return resources.get("vector_store").search(collection_name, query_embedding, k)
+
+
+def query_vector_store(query, collection_name, query_embedding=None):
+    return [hit["document"] for hit in search(query, collection_name, 10, query_embedding)]
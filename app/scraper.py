@@ -1,6 +1,7 @@
 import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
+from app.crawler import Crawler, CRAWL_DEPTH
 
 SITE_URL = "https://www.nileedgeinnovations.org"
 
@@ -39,57 +40,62 @@ def get_site_content(url):
         print(f"Failed to scrape {url}: {e}")
         return {"title": "", "sections": []}
 
-def collect_internal_links(html, base_url):
+def collect_internal_links(html, page_url):
+    """Same-host links on the page at *page_url*, resolved against that page."""
     soup = BeautifulSoup(html, "html.parser")
+    host = urlsplit(page_url).netloc
     links = set()
     for a in soup.find_all("a", href=True):
         href = a["href"]
         if href.startswith("#"):
             continue
-        full_url = urljoin(base_url, href)
+        full_url = urljoin(page_url, href)
         if full_url.endswith((".jpg", ".jpeg", ".png", ".svg", ".pdf", ".zip")):
             continue
-        if full_url.startswith(base_url):
+        if urlsplit(full_url).netloc == host:
             links.add(full_url)
     return sorted(list(links))
 
-def get_all_site_content(base_url):
-    try:
-        html = requests.get(base_url, timeout=10).text
-        subpages = collect_internal_links(html, base_url)
-        print("Found subpages:", subpages)
-    except Exception as e:
-        print(f"Failed to get links from {base_url}: {e}")
-        subpages = []
+def extract_structured_sections(html, page_url):
+    soup = BeautifulSoup(html, "html.parser")
 
-    all_structured_data = []
-    for page_url in [base_url] + subpages:
-        print(f"Scraping {page_url} ...")
-        try:
-            page_html = requests.get(page_url, timeout=10).text
-            soup = BeautifulSoup(page_html, "html.parser")
+    def select_text(selector):
+        return [el.get_text(strip=True) for el in soup.select(selector)]
 
-            def select_text(selector):
-                return [el.get_text(strip=True) for el in soup.select(selector)]
+    # Group into meaningful sections
+    return {
+        "source_url": page_url,
+        "sections": {
+            "hero": select_text("#hero h2, #hero p"),
+            "about": select_text(".section-blog .blog_text"),
+            "services": select_text("#services .service-item p, #services .service-item h3"),
+            "testimonials": select_text(".testimonial-item span"),
+            "faq": select_text(".accordion-body p"),
+            "contact": select_text(".info-item p, .info-item h3"),
+            "team": select_text(".member-info h4, .member-info span"),
+            "blog": select_text(".blog_text, .blog_title")
+        }
+    }
 
-            # Group into meaningful sections
-            page_data = {
-                "source_url": page_url,
-                "sections": {
-                    "hero": select_text("#hero h2, #hero p"),
-                    "about": select_text(".section-blog .blog_text"),
-                    "services": select_text("#services .service-item p, #services .service-item h3"),
-                    "testimonials": select_text(".testimonial-item span"),
-                    "faq": select_text(".accordion-body p"),
-                    "contact": select_text(".info-item p, .info-item h3"),
-                    "team": select_text(".member-info h4, .member-info span"),
-                    "blog": select_text(".blog_text, .blog_title")
-                }
-            }
-            all_structured_data.append(page_data)
+def get_all_site_content(base_url, depth=CRAWL_DEPTH, crawler=None):
+    """
+    Crawl *base_url* breadth-first to *depth* with a concurrent, pooled
+    crawler and return (structured_pages, subpage_urls).  Pages that could
+    not be fetched or parsed are left in ``crawler.failed``.
+    """
+    crawler = crawler or Crawler()
+    pages = crawler.crawl(base_url, depth=depth, extract_links=collect_internal_links)
+    subpages = [p["url"] for p in pages if p["depth"] > 0]
+    print("Found subpages:", subpages)
 
+    all_structured_data = []
+    for page in pages:
+        try:
+            page_data = extract_structured_sections(page["html"], page["url"])
+            page_data["not_modified"] = page["not_modified"]
+            all_structured_data.append(page_data)
         except Exception as e:
-            print(f"Failed to scrape {page_url}: {e}")
+            print(f"Failed to scrape {page['url']}: {e}")
+            crawler.failed[page["url"]] = e
 
     return all_structured_data, subpages
-
@@ -0,0 +1,159 @@
+"""
+Async (ASGI) serving for the /chat and /history routes.
+
+    uvicorn app.server:app --port 7860      (or: python app.py --asgi)
+
+Each answer is generated by the blocking chat pipeline in its own thread
+and handed to the event loop through a small bounded buffer, so a slow
+client pauses generation instead of piling tokens up in memory and an
+idle connection costs no worker while it waits.  When the client goes
+away the generator chain is closed, which stops engine.stream.
+"""
+
+import os, json, asyncio, threading, contextlib
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.chatbot import (chat_stream, history_page, history_query, save_history,
+                         clear_history, save_data, warmup)
+from app import metrics
+
+MAX_CONCURRENCY = int(os.getenv("ASGI_MAX_CONCURRENCY", 8))    # answers generated at once
+QUEUE_TIMEOUT   = float(os.getenv("ASGI_QUEUE_TIMEOUT", 30))   # seconds before a 503
+STREAM_BUFFER   = int(os.getenv("ASGI_STREAM_BUFFER", 16))     # chunks buffered per client
+
+_slots = None
+_DONE  = object()
+
+
+async def iterate_in_thread(gen, buffer=STREAM_BUFFER):
+    """
+    Drive the blocking generator *gen* in a thread and yield its items.
+    At most *buffer* items are in flight; cancelling the consumer closes *gen*.
+    """
+    loop      = asyncio.get_running_loop()
+    items     = asyncio.Queue()
+    credits   = threading.Semaphore(buffer)
+    cancelled = threading.Event()
+
+    def produce():
+        try:
+            for item in gen:
+                while not credits.acquire(timeout=0.5):
+                    if cancelled.is_set():
+                        return
+                if cancelled.is_set():
+                    return
+                loop.call_soon_threadsafe(items.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(items.put_nowait, e)
+        finally:
+            gen.close()                               # propagates into engine.stream
+            if not cancelled.is_set():
+                loop.call_soon_threadsafe(items.put_nowait, _DONE)
+
+    threading.Thread(target=produce, daemon=True, name="chat-stream").start()
+    try:
+        while True:
+            item = await items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            credits.release()
+            yield item
+    finally:
+        cancelled.set()
+        credits.release()                             # wake a producer waiting for room
+
+
+class _SlotResponse(StreamingResponse):
+    """Streams the answer and gives its concurrency slot back however the response ends."""
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()         # stops generation if the body never ran out
+            _slots.release()
+
+
+async def chat(request):
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(MAX_CONCURRENCY)
+    try:
+        await asyncio.wait_for(_slots.acquire(), QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        return JSONResponse({"error": "server busy"}, status_code=503)
+
+    try:
+        data = await request.json()
+    except Exception:
+        _slots.release()
+        return JSONResponse({"error": "invalid JSON"}, status_code=400)
+    if not isinstance(data, dict) or not data.get("session_id"):
+        _slots.release()
+        return JSONResponse({"error": "session_id is required"}, status_code=400)
+    message = data.get("message", "")
+    history = data.get("history", [])
+    session_id = data["session_id"]
+
+    async def stream():
+        async for event in iterate_in_thread(chat_stream(message, history, session_id)):
+            yield f"data: {json.dumps(event)}\n\n"  # SSE format: one delta per frame
+
+    # the slot is released by the response, which runs even when stream() never starts
+    return _SlotResponse(stream(), media_type="text/event-stream")
+
+
+async def manage_history(request):
+    if request.method == "GET":
+        try:
+            session_id, cursor, limit = history_query(request.query_params)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        page = await run_in_threadpool(history_page, session_id, cursor, limit)
+        return JSONResponse(page)
+    if request.method == "DELETE":
+        session_id = request.query_params.get("session_id")
+        if not session_id:
+            return JSONResponse({"error": "session_id is required"}, status_code=400)
+        await run_in_threadpool(clear_history, session_id)
+        return JSONResponse({"status": "cleared"})
+    try:
+        body = await request.json()
+    except Exception:
+        return JSONResponse({"error": "invalid JSON"}, status_code=400)
+    if not isinstance(body, dict) or not body.get("session_id"):
+        return JSONResponse({"error": "session_id is required"}, status_code=400)
+    await run_in_threadpool(save_history, body.get("history", []), body["session_id"])
+    return JSONResponse({"status": "saved"})
+
+
+async def prometheus_metrics(request):
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(warmup)                   # load models before taking traffic
+    yield
+    await run_in_threadpool(save_data)                # FAQ cache, question log, index
+
+
+app = Starlette(
+    lifespan=lifespan,
+    routes=[
+        Route("/chat", chat, methods=["POST"]),
+        Route("/history", manage_history, methods=["GET", "POST", "DELETE"]),
+        Route("/metrics", prometheus_metrics),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"],
+                           allow_methods=["*"], allow_headers=["*"])],
+)
@@ -0,0 +1,221 @@
+"""
+Append-only JSONL journal in front of the JSON data files.
+
+Each store keeps its familiar snapshot (e.g. data/faq_cache.json) plus a
+sibling ``<name>.journal`` file.  Request threads only enqueue a record;
+a background thread appends the records that arrive within FLUSH_INTERVAL
+of each other as one batch with one fsync, and periodically compacts the
+journal into a fresh snapshot.  flush() writes the open batch at once.
+
+Compaction is crash-safe:
+    1. write snapshot.tmp and fsync it
+    2. rename journal -> journal.committed   (tmp now holds everything)
+    3. rename snapshot.tmp -> snapshot
+    4. unlink journal.committed
+Recovery finishes step 3/4 if a committed marker is found and discards a
+tmp file without one.  An fcntl lock serialises writers across processes.
+"""
+
+import os, json, time, queue, atexit, pathlib, threading
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:                                   # Windows: no cross-process lock
+    fcntl = None
+
+FLUSH_INTERVAL = 1.0          # seconds a batch of records waits before its write + fsync
+COMPACT_EVERY  = 1_000        # journal records before a snapshot rewrite
+
+
+def load_json(path, default):
+    try:
+        txt = pathlib.Path(path).read_text(encoding="utf-8")
+        return json.loads(txt) if txt.strip() else default
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def _apply_dict(state, rec):
+    op = rec.get("op")
+    if op == "set":
+        state.pop(rec["key"], None)
+        state[rec["key"]] = rec["value"]
+    elif op == "del":
+        state.pop(rec["key"], None)
+    elif op == "touch" and rec["key"] in state:
+        state.move_to_end(rec["key"])
+
+
+def _apply_list(state, rec):
+    if rec.get("op") == "append":
+        state.append(rec["value"])
+
+
+_KINDS = {
+    "dict": (lambda: OrderedDict(), _apply_dict),
+    "list": (list, _apply_list),
+}
+
+
+class Journal:
+    def __init__(self, path, kind, flush_interval=FLUSH_INTERVAL,
+                 compact_every=COMPACT_EVERY):
+        self.path           = pathlib.Path(path)
+        self.journal_path   = self.path.with_name(self.path.name + ".journal")
+        self._committed     = self.path.with_name(self.path.name + ".journal.committed")
+        self._tmp           = self.path.with_name(self.path.name + ".tmp")
+        self._lock_path     = self.path.with_name(self.path.name + ".lock")
+        self._new, self._apply = _KINDS[kind]
+        self.flush_interval = flush_interval
+        self.compact_every  = compact_every
+
+        self._queue   = queue.Queue()
+        self._thread  = None
+        self._start   = threading.Lock()
+        self._pending = 0                               # records since compaction
+        atexit.register(self.flush)
+
+    # ─────────────────────────────────────────
+    # public API (request thread, O(1))
+    # ─────────────────────────────────────────
+    def set(self, key, value):
+        self._put({"op": "set", "key": key, "value": value})
+
+    def delete(self, key):
+        self._put({"op": "del", "key": key})
+
+    def touch(self, key):
+        self._put({"op": "touch", "key": key})
+
+    def push(self, value):
+        self._put({"op": "append", "value": value})
+
+    def load(self):
+        """Snapshot + journal replay; same fallbacks as a plain JSON load."""
+        with self._locked():
+            self._recover()
+            return self._read_state()
+
+    def flush(self, compact=False):
+        """Block until every queued record is on disk (optionally compact)."""
+        if self._thread is None:
+            if compact:
+                self._compact()
+            return
+        done = threading.Event()
+        self._queue.put((done, compact))
+        done.wait()
+
+    # ─────────────────────────────────────────
+    # background flusher
+    # ─────────────────────────────────────────
+    def _put(self, rec):
+        if self._thread is None:
+            with self._start:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, daemon=True,
+                                                    name=f"journal:{self.path.name}")
+                    self._thread.start()
+        self._queue.put(rec)
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            # batch window: records arriving within flush_interval of the first
+            # share one write + fsync; a flush() waiter ends the window early
+            deadline = time.monotonic() + self.flush_interval
+            while not isinstance(items[-1], tuple):
+                try:
+                    items.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            records = [i for i in items if isinstance(i, dict)]
+            waiters = [i for i in items if isinstance(i, tuple)]
+            try:
+                if records:
+                    self._write(records)
+                if (self._pending >= self.compact_every
+                        or any(compact for _, compact in waiters)):
+                    self._compact()
+            except Exception as e:
+                print(f"Error writing journal {self.journal_path}: {e}")
+            for done, _ in waiters:
+                done.set()
+
+    def _write(self, records):
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with self._locked():
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+        self._pending += len(records)
+
+    def _compact(self):
+        with self._locked():
+            self._recover()
+            if not self.journal_path.exists():
+                return
+            state = self._read_state()
+            with open(self._tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(self.journal_path, self._committed)
+            os.replace(self._tmp, self.path)
+            self._committed.unlink()
+        self._pending = 0
+
+    # ─────────────────────────────────────────
+    # helpers (call with the lock held)
+    # ─────────────────────────────────────────
+    def _read_state(self):
+        state  = self._new()
+        loaded = load_json(self.path, None)
+        if isinstance(state, dict) and isinstance(loaded, dict):
+            state.update(loaded)
+        elif isinstance(state, list) and isinstance(loaded, list):
+            state.extend(loaded)
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._apply(state, json.loads(line))
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue                        # torn tail write
+        except FileNotFoundError:
+            pass
+        return state
+
+    def _recover(self):
+        if self._committed.exists():
+            if self._tmp.exists():
+                os.replace(self._tmp, self.path)
+            self._committed.unlink()
+        elif self._tmp.exists():
+            self._tmp.unlink()
+
+    def _locked(self):
+        return _FileLock(self._lock_path)
+
+
+class _FileLock:
+    _local = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self._local.acquire()
+        if fcntl is not None:
+            self._fh = open(self.path, "a")
+            fcntl.flock(self._fh, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+        self._local.release()
@@ -0,0 +1,29 @@
+"""Group a token stream into frames bounded by age and size."""
+
+import time
+
+
+def coalesce(tokens, window_ms=30, max_chars=256):
+    """
+    Yield the concatenation of consecutive *tokens*.  The first token is
+    sent straight away (time to first token is unchanged); after that a
+    frame is closed once it is *window_ms* old or *max_chars* long.  The
+    window is checked as tokens arrive, so a frame never waits on a timer.
+    """
+    window   = window_ms / 1000
+    parts    = []
+    size     = 0
+    deadline = 0.0                                  # flush the first token immediately
+    for tok in tokens:
+        if not tok:
+            continue
+        parts.append(tok)
+        size += len(tok)
+        now = time.perf_counter()
+        if size >= max_chars or now >= deadline:
+            yield "".join(parts)
+            parts    = []
+            size     = 0
+            deadline = now + window
+    if parts:
+        yield "".join(parts)
@@ -0,0 +1,267 @@
+"""
+Local IMAP + SMTP fixture for the email agent.
+
+    python -m app.stub_mail            # run the agent against it and check the results
+    python -m app.stub_mail --serve    # just serve it
+
+Plain-text servers speaking just enough of both protocols for
+app.email_agent: LOGIN / SELECT / UID SEARCH, FETCH, STORE / IDLE on the
+IMAP side and one-connection-many-messages delivery on the SMTP side.
+``deliver()`` drops a message into the inbox and wakes idling clients,
+``drop_idlers()`` cuts every connection that is in IDLE, ``server.sent``
+collects the replies.  The check answers mail with a fixed string, so no
+models are loaded.
+"""
+
+import sys, json, time, email, socket, argparse, threading, socketserver
+from email.mime.text import MIMEText
+
+USER, PASSWORD = "agent@example.com", "secret"
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads      = True
+    allow_reuse_address = True
+
+
+# ─────────────────────────────────────────────
+# IMAP
+# ─────────────────────────────────────────────
+class _ImapHandler(socketserver.StreamRequestHandler):
+    def _send(self, line):
+        with self.write_lock:
+            self.wfile.write(line if isinstance(line, bytes) else line.encode("utf-8") + b"\r\n")
+
+    def handle(self):
+        self.write_lock = threading.Lock()
+        store = self.server
+        self._send("* OK [CAPABILITY IMAP4rev1 IDLE] stub ready")
+        for raw in self.rfile:
+            tag, cmd, args = (raw.decode("utf-8").rstrip("\r\n").split(" ", 2) + ["", ""])[:3]
+            cmd = cmd.upper()
+            if cmd == "CAPABILITY":
+                self._send("* CAPABILITY IMAP4rev1" + (" IDLE" if store.idle_ok else ""))
+            elif cmd == "LOGIN":
+                user, _, password = args.partition(" ")
+                password = password.strip('"')
+                if (user, password) != (USER, PASSWORD):
+                    self._send(f"{tag} NO bad credentials")
+                    continue
+                with store.lock:
+                    store.logins += 1
+            elif cmd == "SELECT":
+                self._send(f"* {len(store.messages)} EXISTS")
+            elif cmd == "UID":
+                sub, _, args = args.partition(" ")
+                self._uid(sub.upper(), args)
+            elif cmd == "IDLE":
+                if not store.idle_ok:
+                    self._send(f"{tag} BAD IDLE not supported")
+                    continue
+                if not self._idle(tag):
+                    return                               # dropped by drop_idlers()
+                continue
+            elif cmd == "LOGOUT":
+                self._send("* BYE")
+                self._send(f"{tag} OK LOGOUT completed")
+                return
+            elif cmd != "NOOP":
+                self._send(f"{tag} BAD unknown command")
+                continue
+            self._send(f"{tag} OK {cmd} completed")
+
+    def _uid(self, sub, args):
+        store = self.server
+        with store.lock:
+            if sub == "SEARCH":
+                uids = [str(u) for u, m in store.messages.items() if not m["seen"]]
+                self._send("* SEARCH " + " ".join(uids) if uids else "* SEARCH")
+            elif sub == "FETCH":
+                # even UIDs come back with UID after the literals, and a flag
+                # update for another message is slipped in between, as real
+                # servers are allowed to do
+                for uid in map(int, args.split(" ", 1)[0].split(",")):
+                    msg = store.messages[uid]["raw"]
+                    head, _, text = msg.partition(b"\r\n\r\n")
+                    head += b"\r\n\r\n"
+                    first, last = (f"UID {uid} ", "") if uid % 2 else ("", f" UID {uid}")
+                    self._send(f"* {uid} FETCH ({first}BODY[HEADER.FIELDS (FROM SUBJECT)] "
+                               f"{{{len(head)}}}\r\n".encode() + head
+                               + f" BODY[TEXT] {{{len(text)}}}\r\n".encode() + text
+                               + f"{last})\r\n".encode())
+                    self._send(f"* {len(store.messages) + 1} FETCH (FLAGS (\\Seen))")
+            elif sub == "STORE":
+                for uid in map(int, args.split(" ", 1)[0].split(",")):
+                    store.messages[uid]["seen"] = True
+                    self._send(f"* {uid} FETCH (UID {uid} FLAGS (\\Seen))")
+
+    def _idle(self, tag):
+        """Serve one IDLE; False when the connection was dropped."""
+        store = self.server
+        self._send("+ idling")
+        with store.lock:
+            store.idlers.append(self)
+        try:
+            line = self.rfile.readline()
+        except ConnectionResetError:
+            line = b""
+        finally:
+            with store.lock:
+                if self in store.idlers:
+                    store.idlers.remove(self)
+        if line.strip().upper() != b"DONE":
+            return False
+        self._send(f"{tag} OK IDLE terminated")
+        return True
+
+
+# ─────────────────────────────────────────────
+# SMTP
+# ─────────────────────────────────────────────
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def _send(self, line):
+        self.wfile.write(line.encode("utf-8") + b"\r\n")
+
+    def handle(self):
+        self._send("220 stub ESMTP")
+        for raw in self.rfile:
+            cmd = raw.decode("utf-8").strip().split(" ", 1)[0].upper()
+            if cmd in ("EHLO", "HELO"):
+                self._send("250 stub")
+            elif cmd in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self._send("250 OK")
+            elif cmd == "DATA":
+                self._send("354 end with .")
+                lines = []
+                for line in self.rfile:
+                    if line.rstrip(b"\r\n") == b".":
+                        break
+                    lines.append(line[1:] if line.startswith(b"..") else line)
+                with self.server.lock:
+                    self.server.sent.append(email.message_from_bytes(b"".join(lines)))
+                self._send("250 queued")
+            elif cmd == "QUIT":
+                self._send("221 bye")
+                return
+            else:
+                self._send("502 not implemented")
+
+
+def start(host="127.0.0.1", imap_port=0, smtp_port=0, idle=True):
+    """Start both servers in daemon threads; returns (imap, smtp)."""
+    imap          = _Server((host, imap_port), _ImapHandler)
+    imap.lock     = threading.Lock()
+    imap.messages = {}
+    imap.idlers   = []
+    imap.logins   = 0
+    imap.idle_ok  = idle
+    smtp          = _Server((host, smtp_port), _SmtpHandler)
+    smtp.lock     = threading.Lock()
+    smtp.sent     = []
+    for server in (imap, smtp):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return imap, smtp
+
+
+def deliver(imap, sender, subject, body):
+    """Add an unread message and tell every idling client about it."""
+    msg = MIMEText(body)
+    msg["From"], msg["Subject"] = sender, subject
+    with imap.lock:
+        uid = len(imap.messages) + 1
+        imap.messages[uid] = {"raw": msg.as_bytes().replace(b"\n", b"\r\n"), "seen": False}
+        idlers = list(imap.idlers)
+    for handler in idlers:
+        handler._send(f"* {uid} EXISTS")
+    return uid
+
+
+def drop_idlers(imap):
+    """Cut the connections of clients that are in IDLE, as a server timeout would."""
+    with imap.lock:
+        idlers, imap.idlers[:] = list(imap.idlers), []
+    for handler in idlers:
+        handler.request.shutdown(socket.SHUT_RDWR)
+    return len(idlers)
+
+
+def _wait(cond, timeout, what):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > deadline:
+            raise AssertionError(f"timed out waiting for {what}")
+        time.sleep(0.05)
+
+
+def check():
+    """Run the agent in scheduled mode: IDLE wake-up, a drop during IDLE, reconnect."""
+    from app import email_agent
+    from app.email_agent import Mailbox, Mailer
+
+    email_agent.answer        = lambda text: f"stub answer to: {text.strip()}"
+    email_agent.EMAIL_ADDRESS = USER                             # From: of the replies
+    imap, smtp = start()
+    mailbox = Mailbox("127.0.0.1", imap.server_address[1], USER, PASSWORD, use_ssl=False)
+    mailer  = Mailer("127.0.0.1", smtp.server_address[1], user="", use_ssl=False)
+
+    deliver(imap, "ada@example.com", "Pricing", "What do you charge?")
+    threading.Thread(target=email_agent.run, args=("scheduled", mailbox, mailer),
+                     daemon=True).start()
+    _wait(lambda: len(smtp.sent) == 1, 10, "the reply to the unread message")
+    assert imap.messages[1]["seen"], "answered message not marked \\Seen"
+    assert smtp.sent[0]["To"] == "ada@example.com" and smtp.sent[0]["Subject"] == "Re: Pricing"
+
+    _wait(lambda: imap.idlers, 5, "IDLE")
+    deliver(imap, "bob@example.com", "Hours", "When are you open?")
+    _wait(lambda: len(smtp.sent) == 2, 5, "the reply pushed by IDLE")
+    assert imap.logins == 1
+
+    _wait(lambda: imap.idlers, 5, "IDLE")
+    assert drop_idlers(imap) == 1
+    deliver(imap, "cy@example.com", "Support", "Do you offer support?")
+    _wait(lambda: len(smtp.sent) == 3, 15, "the reply after reconnecting")
+    assert imap.logins == 2, imap.logins
+    assert "Do you offer support?" in smtp.sent[2].get_payload()
+
+    # a batch of several: every message keeps its own UID and sender
+    batch, _ = start()
+    for n in range(4):
+        deliver(batch, f"u{n}@example.com", f"Q{n}", f"question {n}")
+    box = Mailbox("127.0.0.1", batch.server_address[1], USER, PASSWORD, use_ssl=False)
+    box.connect()
+    mails = box.fetch(box.unseen_uids())
+    assert [(m["uid"], m["from"], m["body"].strip()) for m in mails] == \
+        [(str(n + 1).encode(), f"u{n}@example.com", f"question {n}") for n in range(4)], mails
+    box.close()
+
+    # a server without IDLE (or refusing it) makes the agent poll instead
+    plain, _ = start(idle=False)
+    box = Mailbox("127.0.0.1", plain.server_address[1], USER, PASSWORD, use_ssl=False)
+    box.connect()
+    box.imap.capabilities = box.imap.capabilities + ("IDLE",)     # claims it, then refuses
+    try:
+        box.idle(timeout=1)
+        raise AssertionError("refused IDLE not reported")
+    except email_agent.imaplib.IMAP4.error:
+        pass
+    assert not box.supports_idle()
+    box.close()
+
+    for server in (imap, smtp, batch, plain):
+        server.shutdown()
+    print(json.dumps({"ok": True, "replies": [m["To"] for m in smtp.sent],
+                      "logins": imap.logins}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IMAP/SMTP fixture for the email agent")
+    parser.add_argument("--serve", action="store_true", help="serve until interrupted")
+    parser.add_argument("--imap-port", type=int, default=1143)
+    parser.add_argument("--smtp-port", type=int, default=1025)
+    args = parser.parse_args()
+    if not args.serve:
+        sys.exit(check())
+    imap, smtp = start(imap_port=args.imap_port, smtp_port=args.smtp_port)
+    print(f"Fixture IMAP on 127.0.0.1:{imap.server_address[1]}, SMTP on "
+          f"127.0.0.1:{smtp.server_address[1]} (login {USER} / {PASSWORD})")
+    threading.Event().wait()
@@ -0,0 +1,122 @@
+"""
+Local website fixture for the crawler.
+
+    python -m app.stub_site            # crawl the fixture and check the results
+    python -m app.stub_site --serve    # just serve it
+
+A handful of linked pages covering what app.crawler has to get right:
+relative links on subpages, duplicate and external links, a depth limit,
+ETag / If-None-Match revalidation, a page that fails with 503 before it
+succeeds and one that answers 304 to a request without validators.
+``server.hits`` counts requests per path.
+"""
+
+import sys, json, argparse, tempfile, threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGES = {
+    "/":           ['about/', '/services', '/services#pricing', 'flaky', 'bogus304',
+                    'http://elsewhere.example/x', 'logo.png'],
+    "/about/":     ['team', '../services', '/'],          # relative to /about/
+    "/about/team": ['deep'],                              # -> /about/deep, depth 3
+    "/about/deep": [],
+    "/services":   ['/about/'],
+    "/flaky":      [],
+    "/bogus304":   [],
+}
+ETAG       = '"v1"'
+FLAKY_FAIL = 2                # 503s before /flaky succeeds
+
+
+def _html(path):
+    links = "".join(f'<a href="{href}">{href}</a>' for href in PAGES[path])
+    return f"<html><head><title>{path}</title></head><body><p>Page {path}</p>{links}</body></html>"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path
+        with self.server.lock:
+            self.server.hits[path] += 1
+            hits = self.server.hits[path]
+        if path not in PAGES:
+            self.send_error(404)
+            return
+        if path == "/flaky" and hits <= FLAKY_FAIL:
+            self.send_error(503)
+            return
+        if path == "/bogus304" and hits == 1:
+            self._reply(304)                               # no validators were sent
+            return
+        if path == "/services" and self.headers.get("If-None-Match") == ETAG:
+            self._reply(304)
+            return
+        body = _html(path).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if path == "/services":
+            self.send_header("ETag", ETAG)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reply(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def start(host="127.0.0.1", port=0):
+    """Start the fixture in a daemon thread; returns the server (see .server_port, .hits)."""
+    server      = ThreadingHTTPServer((host, port), _Handler)
+    server.hits = Counter()
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def check():
+    """Crawl the fixture twice and verify depth, dedup, retries and revalidation."""
+    from app.crawler import Crawler
+    from app.scraper import collect_internal_links
+
+    server = start()
+    base   = f"http://127.0.0.1:{server.server_port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        def crawl():
+            crawler = Crawler(host_interval=0, backoff=0.01, cache_path=f"{tmp}/fetch_cache.json")
+            pages   = crawler.crawl(base + "/", depth=2, extract_links=collect_internal_links)
+            return {p["url"][len(base):]: p for p in pages}
+
+        first = crawl()
+        assert sorted(first) == ["/", "/about/", "/about/team", "/bogus304", "/flaky", "/services"], sorted(first)
+        assert first["/about/team"]["depth"] == 2                      # relative to /about/
+        assert server.hits["/services"] == 1, "duplicate links fetched twice"
+        assert server.hits["/about/deep"] == 0, "depth limit ignored"
+        assert server.hits["/flaky"] == FLAKY_FAIL + 1, "503 not retried"
+        assert "Page /bogus304" in first["/bogus304"]["html"], "304 without validators cached empty"
+        assert not any(p["not_modified"] for p in first.values())
+
+        second = crawl()
+        assert second["/services"]["not_modified"], "ETag not revalidated"
+        assert "Page /services" in second["/services"]["html"]
+        assert not second["/"]["not_modified"]                         # no validators for /
+
+    server.shutdown()
+    print(json.dumps({"ok": True, "pages": sorted(first), "hits": dict(server.hits)}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Website fixture for the crawler")
+    parser.add_argument("--serve", action="store_true", help="serve until interrupted")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+    if not args.serve:
+        sys.exit(check())
+    server = start(port=args.port)
+    print(f"Fixture site on http://127.0.0.1:{server.server_port}/")
+    threading.Event().wait()
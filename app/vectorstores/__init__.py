@@ -0,0 +1,41 @@
+"""
+Factory for the retrieval back-end.
+
+Every store implements
+
+    upsert(collection, docs, embed, batch_size) -> {"added", "removed", "unchanged"}
+        docs:  {doc_id(text): text}, the complete new contents
+        embed: callable(list_of_texts) -> (n, dim) normalised float32 array,
+               called only for ids the store does not already hold
+    search(collection, embedding, k) -> [{"id", "document", "score", "vector"}, ...]
+        score is cosine similarity, best first; vector is the chunk embedding
+
+and swaps a refreshed collection in atomically, so queries never see a
+partial index.
+
+Back-ends (app.config.VECTOR_BACKEND)
+-------------------------------------
+chroma   chromadb PersistentClient under data/chroma (default)
+mmap     memory-mapped .npy matrix + JSON chunk store under data/vectors
+"""
+import os, hashlib, pathlib
+
+DATA_DIR = pathlib.Path(__file__).resolve().parents[2] / "data"
+
+def doc_id(text):
+    """Content-hash id: identical chunks share an id across refreshes."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def get_store(backend, dtype="float32", quantization="none"):
+    backend = backend.lower()
+
+    if backend == "chroma":
+        from .chroma import ChromaStore
+        return ChromaStore(os.path.join(DATA_DIR, "chroma"))
+
+    if backend == "mmap":
+        from .mmap import MmapStore
+        return MmapStore(DATA_DIR / "vectors", dtype=dtype, quantization=quantization)
+
+    raise ValueError(f"Unsupported VECTOR_BACKEND='{backend}'")
@@ -0,0 +1,148 @@
+"""
+Chroma-backed vector store with shadow-collection refreshes.
+
+A refresh writes a new physical collection and swaps the alias to it.
+Where Chroma can fork a collection (copy-on-write, Chroma server/cloud)
+the shadow is a fork and only the diff is written; local persistent
+Chroma cannot fork, so there the unchanged vectors are copied in bulk
+(no re-embedding, but the write is proportional to the KB).  A refresh
+with nothing added or removed writes nothing.
+"""
+
+import os, json, time
+
+import numpy as np
+from chromadb import PersistentClient
+
+from . import doc_id
+
+
+class ChromaStore:
+    def __init__(self, persist_dir):
+        os.makedirs(persist_dir, exist_ok=True)
+        # Logical collection name -> physical Chroma collection currently serving it.
+        # Refreshes build a new physical collection and swap this pointer.
+        self.alias_file   = os.path.join(persist_dir, "aliases.json")
+        self.db           = PersistentClient(path=persist_dir)
+        self._aliases     = {"mtime": None, "map": {}}
+        self._collections = {}                   # physical name -> Collection handle
+
+    def resolve(self, collection_name):
+        """Physical collection behind *collection_name* (re-read when the alias file changes)."""
+        try:
+            mtime = os.stat(self.alias_file).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._aliases["mtime"]:
+            try:
+                with open(self.alias_file, encoding="utf-8") as f:
+                    self._aliases["map"] = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._aliases["map"] = {}
+            self._aliases["mtime"] = mtime
+        return self._aliases["map"].get(collection_name, collection_name)
+
+    def _swap_alias(self, collection_name, physical):
+        aliases = dict(self._aliases["map"])
+        try:
+            with open(self.alias_file, encoding="utf-8") as f:
+                aliases = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        aliases[collection_name] = physical
+        tmp = self.alias_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(aliases, f, indent=2)
+        os.replace(tmp, self.alias_file)       # atomic: readers see old or new, never neither
+
+    def _existing(self, physical):
+        if physical not in self._collections:
+            if physical not in [c.name for c in self.db.list_collections()]:
+                return None
+            self._collections[physical] = self.db.get_collection(physical)
+        return self._collections[physical]
+
+    def _live_vectors(self, collection, batch_size):
+        """Map content hash -> (stored id, embedding) for everything in *collection*."""
+        vectors = {}
+        if collection is None:
+            return vectors
+        total = collection.count()
+        for offset in range(0, total, batch_size):
+            got = collection.get(limit=batch_size, offset=offset,
+                                 include=["documents", "embeddings"])
+            for i, text, emb in zip(got["ids"], got["documents"], got["embeddings"]):
+                vectors[doc_id(text)] = (i, emb)
+        return vectors
+
+    def _fork(self, live, shadow_name, reused):
+        """Copy-on-write shadow of *live*, or None where Chroma cannot fork."""
+        # legacy (non-hash) ids would survive a fork; rebuild those collections instead
+        if live is None or any(i != h for h, (i, _) in reused.items()):
+            return None
+        try:
+            return live.fork(shadow_name)
+        except (AttributeError, NotImplementedError):
+            return None
+
+    def upsert(self, collection_name, docs, embed, batch_size):
+        old_physical = self.resolve(collection_name)
+        live = self._existing(old_physical)
+        # matched by document hash so collections with legacy ids are reused too
+        reused = self._live_vectors(live, batch_size)
+        removed = [i for i in reused if i not in docs]
+        new_ids = [i for i in docs if i not in reused]
+        stats   = {"added": len(new_ids), "removed": len(removed),
+                   "unchanged": len(docs) - len(new_ids)}
+        if live is not None and not new_ids and not removed:
+            return stats
+
+        vectors = {h: emb for h, (_, emb) in reused.items()}
+        for start in range(0, len(new_ids), batch_size):
+            batch = new_ids[start:start + batch_size]
+            vectors.update(zip(batch, embed([docs[i] for i in batch])))
+
+        shadow_name = f"{collection_name}__{int(time.time() * 1000)}"
+        shadow = self._fork(live, shadow_name, reused)
+        try:
+            if shadow is not None:
+                ids = new_ids
+                for start in range(0, len(removed), batch_size):
+                    shadow.delete(ids=removed[start:start + batch_size])
+            else:
+                shadow = self.db.create_collection(shadow_name)
+                ids = list(docs)
+            for start in range(0, len(ids), batch_size):
+                batch = ids[start:start + batch_size]
+                shadow.add(ids=batch,
+                           documents=[docs[i] for i in batch],
+                           embeddings=[list(map(float, vectors[i])) for i in batch])
+        except Exception:
+            # never leave a half-built shadow behind; the live collection is untouched
+            try:
+                self.db.delete_collection(shadow_name)
+            except Exception:
+                pass
+            raise
+
+        self._swap_alias(collection_name, shadow_name)
+        self._collections[shadow_name] = shadow
+        if live is not None:
+            self._collections.pop(old_physical, None)
+            self.db.delete_collection(old_physical)
+
+        return stats
+
+    def search(self, collection_name, embedding, k):
+        collection = self._existing(self.resolve(collection_name))
+        if collection is None:
+            return []
+        results = collection.query(query_embeddings=[list(map(float, embedding))], n_results=k,
+                                   include=["documents", "distances", "embeddings"])
+        if not results.get("ids") or not results["ids"][0]:
+            return []
+        # default "l2" space stores squared distance; for unit vectors d = 2 - 2cos
+        return [{"id": i, "document": d, "score": 1.0 - dist / 2,
+                 "vector": np.asarray(v, dtype=np.float32)}
+                for i, d, dist, v in zip(results["ids"][0], results["documents"][0],
+                                         results["distances"][0], results["embeddings"][0])]
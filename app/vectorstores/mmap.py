@@ -0,0 +1,151 @@
+"""
+In-process vector store: one memory-mapped .npy matrix per collection.
+
+Layout under data/vectors/<collection>/:
+    <version>.npy         normalised vectors, float32 (or float16), one row per chunk
+    <version>.meta.json   {"ids": [...], "documents": [...]} in row order
+    <version>.codes.npy   int8 codes, with .scales.npy and .bits.npy (sign bits)
+    CURRENT               name of the version being served
+
+A refresh writes a new version and atomically replaces CURRENT; readers
+notice the new mtime and re-map.  Opening a collection only maps the
+file, so startup cost does not grow with the index.
+
+With quantization "int8" or "binary" only the compact codes are held in
+RAM and scanned; the shortlist is reranked against the float rows of the
+mapped matrix, so just those pages are read.
+"""
+
+import os, json, time, pathlib, threading
+
+import numpy as np
+
+from app.quantize import quantize_int8, pack_signs, shortlist, top_k
+
+RERANK     = 128              # shortlist size for quantized scans (at least 4 * k)
+SCAN_BLOCK = 8192             # float16 rows upcast per step of a full scan
+
+
+def _scores(matrix, query, block=SCAN_BLOCK):
+    """matrix @ query in float32; float16 rows are upcast one block at a time, not all at once."""
+    if matrix.dtype == query.dtype:
+        return matrix @ query
+    out = np.empty(len(matrix), dtype=np.float32)
+    for start in range(0, len(matrix), block):
+        out[start:start + block] = matrix[start:start + block].astype(np.float32) @ query
+    return out
+
+
+class _Collection:
+    def __init__(self, folder, version, mode):
+        self.version   = version
+        self.matrix    = np.load(folder / f"{version}.npy", mmap_mode="r")
+        meta           = json.loads((folder / f"{version}.meta.json").read_text(encoding="utf-8"))
+        self.ids       = meta["ids"]
+        self.documents = meta["documents"]
+        self.codes = self.scales = self.bits = None
+        try:                                            # only what this mode scans is held in RAM
+            if mode == "int8":
+                self.codes  = np.load(folder / f"{version}.codes.npy")
+                self.scales = np.load(folder / f"{version}.scales.npy")
+            elif mode == "binary":
+                self.bits   = np.load(folder / f"{version}.bits.npy")
+        except FileNotFoundError:                       # written before quantization existed
+            if mode == "int8":
+                self.codes, self.scales = quantize_int8(self.matrix)
+            else:
+                self.bits = pack_signs(self.matrix)
+
+    @property
+    def quantized(self):
+        return self.codes is not None or self.bits is not None
+
+    def nbytes(self):
+        """Bytes held in RAM for scanning (the mapped float matrix is paged, not held)."""
+        return sum(a.nbytes for a in (self.codes, self.scales, self.bits) if a is not None)
+
+
+class MmapStore:
+    def __init__(self, root, dtype="float32", quantization="none"):
+        self.root    = pathlib.Path(root)
+        self.dtype   = np.dtype(dtype)
+        self.mode    = quantization
+        self._open   = {}                         # name -> (CURRENT mtime, _Collection)
+        self._lock   = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _collection(self, name):
+        current = self.root / name / "CURRENT"
+        try:
+            mtime = current.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self._open.get(name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with self._lock:
+            coll = _Collection(self.root / name, current.read_text().strip(), self.mode)
+            self._open[name] = (mtime, coll)
+        return coll
+
+    def upsert(self, collection_name, docs, embed, batch_size):
+        folder = self.root / collection_name
+        folder.mkdir(parents=True, exist_ok=True)
+        live   = self._collection(collection_name)
+        rows   = {i: r for r, i in enumerate(live.ids)} if live else {}
+
+        ids     = list(docs)
+        new_ids = [i for i in ids if i not in rows]
+        fresh   = {}
+        for start in range(0, len(new_ids), batch_size):
+            batch = new_ids[start:start + batch_size]
+            fresh.update(zip(batch, embed([docs[i] for i in batch])))
+
+        dim     = len(next(iter(fresh.values()))) if fresh else (live.matrix.shape[1] if live else 0)
+        version = str(int(time.time() * 1000))
+        tmp     = folder / f"{version}.npy.tmp"
+        out     = np.lib.format.open_memmap(tmp, mode="w+", dtype=self.dtype,
+                                            shape=(len(ids), dim))
+        for r, i in enumerate(ids):
+            out[r] = fresh[i] if i in fresh else live.matrix[rows[i]]
+        out.flush()
+        codes, scales = quantize_int8(out)
+        bits = pack_signs(out)
+        del out
+        for suffix, array in (("codes", codes), ("scales", scales), ("bits", bits)):
+            np.save(folder / f"{version}.{suffix}.npy", array)
+        os.replace(tmp, folder / f"{version}.npy")
+        (folder / f"{version}.meta.json").write_text(
+            json.dumps({"ids": ids, "documents": [docs[i] for i in ids]}, ensure_ascii=False),
+            encoding="utf-8")
+
+        pointer = folder / "CURRENT.tmp"
+        pointer.write_text(version)
+        os.replace(pointer, folder / "CURRENT")
+
+        # keep the previous version for readers that have not re-mapped yet
+        keep = {version, live.version if live else None, "CURRENT"}
+        for f in folder.iterdir():
+            if f.name.split(".")[0] not in keep:
+                f.unlink(missing_ok=True)
+
+        return {"added": len(new_ids), "removed": sum(1 for i in rows if i not in docs),
+                "unchanged": len(ids) - len(new_ids)}
+
+    def search(self, collection_name, embedding, k):
+        coll = self._collection(collection_name)
+        if coll is None or not coll.ids:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        if not coll.quantized:
+            scores = _scores(coll.matrix, query)
+            top    = top_k(scores, k)
+        else:
+            rows   = np.sort(shortlist(self.mode, query, k, max(RERANK, 4 * k),
+                                       coll.codes, coll.scales, coll.bits))
+            exact  = coll.matrix[rows] @ query
+            scores = dict(zip(rows.tolist(), exact.tolist()))
+            top    = rows[top_k(exact, k)]
+        return [{"id": coll.ids[r], "document": coll.documents[r], "score": float(scores[r]),
+                 "vector": np.asarray(coll.matrix[r], dtype=np.float32)}
+                for r in top]
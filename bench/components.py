@@ -0,0 +1,212 @@
+"""
+Component micro-benchmarks for the chat pipeline.
+
+Runs offline by default: a deterministic fake engine and embedder, the
+fixture KB in bench/fixtures and a throw-away mmap vector store, so the
+numbers are comparable across commits.  --real uses the configured engine
+and embedding model instead (opt-in, needs the model files).
+
+    python bench/components.py --out bench_components.json
+"""
+
+import io, os, sys, json, time, argparse, platform, tempfile, subprocess, contextlib
+from collections import OrderedDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fakes import FakeEngine, FakeEmbedder, fixture_chunks
+from app import resources
+from app.faq_index import FaqIndex
+from app.history import HistoryStore
+from app.kb_state import KbState
+from app.response_cache import ResponseCache, cache_key
+from app.storage import Journal
+from app.vectorstores.mmap import MmapStore
+
+QUESTIONS = [
+    "What services does NileEdge offer?",
+    "Do you run training programmes?",
+    "Where is the head office?",
+    "How much does a pilot project cost?",
+    "Can you help hospitals with AI?",
+]
+
+
+def _stats(samples):
+    s = sorted(samples)
+    return {
+        "n":       len(s),
+        "p50_us":  round(s[len(s) // 2] * 1e6, 1),
+        "p95_us":  round(s[min(len(s) - 1, int(len(s) * 0.95))] * 1e6, 1),
+        "mean_us": round(sum(s) / len(s) * 1e6, 1),
+    }
+
+
+def _time(fn, repeat):
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return _stats(samples)
+
+
+def setup(real, tmp):
+    """Import app.chatbot with its caches, logs and history redirected into *tmp*."""
+    if not real:
+        resources.override("engine", FakeEngine())
+        resources.override("embedder", FakeEmbedder())
+    resources.override("vector_store", MmapStore(os.path.join(tmp, "vectors")))
+
+    from app import chatbot
+    chatbot.cache_journal  = Journal(os.path.join(tmp, "faq_cache.json"), "dict")
+    chatbot.log_journal    = Journal(os.path.join(tmp, "questions_log.json"), "list")
+    chatbot.response_cache = ResponseCache(chatbot.cache_journal, chatbot.CACHE_LIMIT,
+                                           chatbot.FAQ_THRESHOLD,
+                                           kb_state=KbState(os.path.join(tmp, "kb_state.json")))
+    chatbot.question_log   = []
+    chatbot.history_store  = HistoryStore(os.path.join(tmp, "history.sqlite3"), ttl_days=0)
+    return chatbot
+
+
+# ─────────────────────────────────────────────
+# benchmarks
+# ─────────────────────────────────────────────
+def bench_faq_match(chatbot, sizes, repeat):
+    """Exact tier (hash lookup) and semantic tier (index search) on a warm cache."""
+    embedder = resources.get("embedder")
+    queries  = [embedder.encode_query(q) for q in QUESTIONS]
+    exact    = [cache_key(q) for q in QUESTIONS]
+    cache    = chatbot.response_cache
+    results  = {}
+    for n in sizes:
+        keys  = [f"cached question {i} about {QUESTIONS[i % len(QUESTIONS)].lower()}" for i in range(n)]
+        keys[:len(exact)] = exact
+        index = FaqIndex(embedder.dim)
+        for key, vec in zip(keys, embedder.encode(keys)):
+            index.add(key, vec)
+        cache.entries = OrderedDict((k, {"answer": "cached", "kb_version": None, "sources": []}) for k in keys)
+        resources.override("faq_index", index)
+        results[n] = {
+            "exact":    _time(lambda i: cache.lookup(exact[i % 5]), repeat),
+            "semantic": _time(lambda i: chatbot.semantic_faq_match(QUESTIONS[i % 5], queries[i % 5]),
+                              repeat),
+        }
+    cache.entries = OrderedDict()
+    resources.override("faq_index", FaqIndex(embedder.dim))
+    return results
+
+
+def bench_retrieval(sizes, repeat):
+    from app.retrieval import update_vector_store, query_vector_store
+    embedder = resources.get("embedder")
+    queries  = [embedder.encode_query(q) for q in QUESTIONS]
+    results  = {}
+    for n in sizes:
+        collection = f"bench_{n}"
+        update_vector_store(collection, fixture_chunks(n))
+        results[n] = _time(lambda i: query_vector_store(QUESTIONS[i % 5], collection,
+                                                        query_embedding=queries[i % 5]),
+                           repeat)
+    return results
+
+
+def bench_embedding(batch_sizes, repeat):
+    embedder = resources.get("embedder")
+    texts    = fixture_chunks(max(batch_sizes))
+    results  = {}
+    for b in batch_sizes:
+        stats = _time(lambda i: embedder.encode(texts[:b]), repeat)
+        stats["texts_per_s"] = round(b / (stats["mean_us"] / 1e6), 1)
+        results[b] = stats
+    return results
+
+
+def bench_prompt_assembly(chatbot, repeat):
+    """Time from generate_response() to the engine call: FAQ miss, retrieval, packing, memory."""
+    from app.config import VECTOR_COLLECTION
+    from app.retrieval import update_vector_store
+    update_vector_store(VECTOR_COLLECTION, fixture_chunks())
+    engine  = resources.get("engine")
+    # one exchange: rendered verbatim, so no background summary call races the timing
+    history = [{"role": "user", "content": QUESTIONS[0]},
+               {"role": "assistant", "content": "NileEdge offers AI, data science and automation."}]
+
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        tokens = chatbot.generate_response(f"{QUESTIONS[i % 5]} (variant {i})", history, "bench")
+        next(tokens)
+        tokens.close()
+        # the fake engine records its call time; a real engine adds its TTFT
+        samples.append((getattr(engine, "last_call", None) or time.perf_counter()) - start)
+    return _stats(samples)
+
+
+def bench_streaming(chatbot, repeat, tokens=256):
+    """chat_wrapper cost per token on top of the raw engine stream."""
+    engine = resources.get("engine")
+    engine.tokens = tokens
+
+    raw = _time(lambda i: sum(1 for _ in engine.stream("prompt")), repeat)
+    frames = []
+
+    def wrapped(i):
+        frames.append(sum(1 for _ in chatbot.chat_wrapper(f"streaming question {i}", [], "bench")))
+
+    wrapper = _time(wrapped, repeat)
+    return {
+        "tokens":                  tokens,
+        "raw_stream":              raw,
+        "chat_wrapper":            wrapper,
+        "frames_per_answer":       frames[len(frames) // 2],
+        "overhead_per_token_us":   round((wrapper["p50_us"] - raw["p50_us"]) / tokens, 2),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--real", action="store_true",
+                        help="use the configured engine and embedding model")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--faq-sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--kb-sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = {"meta": {
+        "commit":  _commit(),
+        "mode":    "real" if args.real else "fake",
+        "python":  platform.python_version(),
+        "machine": platform.machine(),
+        "time":    time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }}
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):      # pipeline debug prints
+            chatbot = setup(args.real, tmp)
+            report["faq_match_by_cache_size"]   = bench_faq_match(chatbot, args.faq_sizes, args.repeat)
+            report["retrieval_by_kb_size"]      = bench_retrieval(args.kb_sizes, args.repeat)
+            report["embedding_by_batch_size"]   = bench_embedding(args.batch_sizes, max(5, args.repeat // 20))
+            report["prompt_assembly"]           = bench_prompt_assembly(chatbot, args.repeat)
+            if not args.real:
+                report["streaming_overhead"]    = bench_streaming(chatbot, max(5, args.repeat // 10))
+            chatbot.cache_journal.flush()
+            chatbot.log_journal.flush()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Deterministic stand-ins for the model-backed resources, so the component
+benchmarks run offline in a second and give comparable numbers per commit.
+"""
+
+import time, hashlib, pathlib
+
+import numpy as np
+
+FIXTURE_KB = pathlib.Path(__file__).resolve().parent / "fixtures" / "kb.txt"
+DIM        = 384
+
+
+class FakeEmbedder:
+    """Unit vectors seeded by a hash of the normalised text (same text, same vector)."""
+
+    dim = DIM
+
+    def _vec(self, text):
+        seed = int.from_bytes(hashlib.sha1(" ".join(text.lower().split()).encode("utf-8")).digest()[:8], "little")
+        vec  = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+        return vec / np.linalg.norm(vec)
+
+    def encode(self, texts):
+        if not texts:
+            return np.zeros((0, DIM), dtype=np.float32)
+        return np.stack([self._vec(t) for t in texts])
+
+    def encode_query(self, text):
+        return self._vec(text)
+
+
+class FakeEngine:
+    """Streams a fixed answer; records when each stream() call started."""
+
+    def __init__(self, tokens=64, token_delay=0.0, n_ctx=2048):
+        self.tokens      = tokens
+        self.token_delay = token_delay
+        self.n_ctx       = n_ctx
+        self.last_call   = None
+        self.last_prompt = None
+
+    def count_tokens(self, text):
+        return -(-len(text) // 4)
+
+    def stream(self, prompt, cache_prefix=None, max_tokens=512, **kw):
+        self.last_call   = time.perf_counter()
+        self.last_prompt = prompt
+        for i in range(min(self.tokens, max_tokens)):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield f" word{i}"
+
+
+def fixture_chunks(n=None):
+    """The fixture KB, repeated with distinct suffixes up to *n* chunks."""
+    base = [l.strip() for l in FIXTURE_KB.read_text(encoding="utf-8").splitlines() if l.strip()]
+    if n is None:
+        return base
+    return [base[i % len(base)] + ("" if i < len(base) else f" (ref {i})") for i in range(n)]
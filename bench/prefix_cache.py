@@ -0,0 +1,66 @@
+"""
+Time-to-first-token with and without prompt-prefix state reuse.
+
+Needs the real GGUF model (MODEL_PATH / LLM_THREADS as for get_engine):
+
+    python bench/prefix_cache.py --runs 5
+"""
+
+import os, sys, json, time, argparse, tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.llm import _abs, CONFIG_PATH
+from app.llm.llama_cpp import LlamaCppEngine, PrefixStateCache
+from app.prompts import PROMPT_PREFIX
+
+QUESTIONS = [
+    "Where is NileEdge located?",
+    "What services do you offer?",
+    "Do you run training programmes?",
+    "How can I contact the team?",
+    "Do you work with hospitals?",
+]
+CONTEXT = ("NileEdge Innovations is a technology company offering services in AI, "
+           "data science, automation, and medical AI.\n") * 8
+
+
+def ttft(engine, prompt, prefixes):
+    start = time.perf_counter()
+    for _ in engine.stream(prompt, cache_prefix=prefixes, max_tokens=1):
+        break
+    return time.perf_counter() - start
+
+
+def run(engine, runs, prefixes):
+    samples = []
+    for i in range(runs):
+        q = QUESTIONS[i % len(QUESTIONS)]
+        engine.llm.reset()                             # no reuse from the previous prompt
+        prompt = f"{PROMPT_PREFIX}{CONTEXT}\n\nUser: {q}\nAssistant:\n"
+        samples.append(ttft(engine, prompt, prefixes))
+    samples.sort()
+    return {"median_ms": round(samples[len(samples) // 2] * 1000, 1),
+            "max_ms": round(samples[-1] * 1000, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    model_path = _abs(os.getenv("MODEL_PATH", CONFIG_PATH))
+    n_threads  = int(os.getenv("LLM_THREADS", 4))
+    cache      = PrefixStateCache(1 << 30, tempfile.mkdtemp(), 1 << 32)
+    engine     = LlamaCppEngine(model_path, 2048, n_threads, prefix_cache=cache)
+
+    engine.prefix_cache = None
+    baseline = run(engine, args.runs, None)
+    engine.prefix_cache = cache
+    run(engine, 1, [PROMPT_PREFIX])                    # populate the cache
+    cached = run(engine, args.runs, [PROMPT_PREFIX])
+
+    print(json.dumps({"ttft_no_cache": baseline, "ttft_prefix_cache": cached,
+                      "cache_hits": cache.hits, "cache_misses": cache.misses}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
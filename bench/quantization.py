@@ -0,0 +1,129 @@
+"""
+Recall and speed of quantized vector search against the float32 baseline.
+
+For the FAQ index (best match) and the mmap retrieval store (top-k) it
+reports recall, query latency and resident bytes per vector for each
+quantization mode.  Vectors are synthetic topic clusters by default;
+--real embeds the fixture KB and paraphrased questions with the
+configured embedding model.
+
+    python bench/quantization.py --size 20000
+"""
+
+import os, sys, json, time, argparse, tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fakes import fixture_chunks
+from app.faq_index import FaqIndex
+from app.vectorstores.mmap import MmapStore
+
+MODES         = ("none", "int8", "binary")
+FAQ_THRESHOLD = 0.85          # app.chatbot.FAQ_THRESHOLD: only these matches are served
+
+
+def clustered(n, dim, topics, noise, rng):
+    """Unit vectors around *topics* random centres, like paraphrased questions."""
+    centres = rng.standard_normal((topics, dim)).astype(np.float32)
+    vecs    = centres[rng.integers(0, topics, n)] + noise * rng.standard_normal((n, dim)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def perturb(vecs, noise, rng):
+    q = vecs + noise * rng.standard_normal(vecs.shape).astype(np.float32) / np.sqrt(vecs.shape[1])
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def _ms(samples):
+    samples = sorted(samples)
+    return {"p50_us": round(samples[len(samples) // 2] * 1e6, 1),
+            "mean_us": round(sum(samples) / len(samples) * 1e6, 1)}
+
+
+def bench_faq(vecs, queries):
+    keys    = [f"q{i}" for i in range(len(vecs))]
+    results = {}
+    truth   = None
+    for mode in MODES:
+        index = FaqIndex(vecs.shape[1], quantization=mode)
+        for key, vec in zip(keys, vecs):
+            index.add(key, vec)
+        found, samples = [], []
+        for q in queries:
+            start = time.perf_counter()
+            found.append(index.search(q))
+            samples.append(time.perf_counter() - start)
+        truth  = truth or found
+        served = [i for i, (_, sim) in enumerate(truth) if sim >= FAQ_THRESHOLD]
+        results[mode] = {
+            "recall_at_1":      round(sum(a[0] == b[0] for a, b in zip(found, truth)) / len(truth), 4),
+            "recall_served":    round(sum(found[i][0] == truth[i][0] for i in served) / len(served), 4)
+                                if served else None,
+            "resident_bytes_per_vector": round(index.nbytes() / len(index), 1),
+            **_ms(samples),
+        }
+    return results
+
+
+def bench_retrieval(vecs, queries, k, tmp):
+    docs    = {f"c{i}": f"c{i}" for i in range(len(vecs))}      # text doubles as the id
+    by_id   = dict(zip(docs, vecs))
+    results = {}
+    truth   = None
+    for mode in MODES:
+        store = MmapStore(os.path.join(tmp, mode), quantization=mode)
+        store.upsert("bench", docs, lambda texts: np.stack([by_id[t] for t in texts]), 4096)
+        coll = store._collection("bench")
+        found, samples = [], []
+        for q in queries:
+            start = time.perf_counter()
+            found.append([h["id"] for h in store.search("bench", q, k)])
+            samples.append(time.perf_counter() - start)
+        truth = truth or found
+        # a float scan pages in the whole mapped matrix; quantized modes hold
+        # their codes in RAM and touch only the reranked float rows
+        resident = coll.nbytes() if coll.quantized else coll.matrix.nbytes
+        results[mode] = {
+            f"recall_at_{k}":  round(float(np.mean([len(set(a) & set(b)) / k
+                                                    for a, b in zip(found, truth)])), 4),
+            "resident_bytes_per_vector": round(resident / len(vecs), 1),
+            **_ms(samples),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=20_000, help="vectors per index")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--noise", type=float, default=0.5,
+                        help="query distance from its source vector (synthetic data)")
+    parser.add_argument("--real", action="store_true",
+                        help="embed fixture text with the configured model")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.real:
+        from app.embeddings import get_embedder
+        embedder = get_embedder()
+        vecs     = embedder.encode(fixture_chunks(args.size))
+        queries  = embedder.encode([c.split(".")[0] for c in fixture_chunks(args.queries)])
+    else:
+        vecs    = clustered(args.size, 384, max(1, args.size // 50), 0.6, rng)
+        queries = perturb(vecs[rng.integers(0, args.size, args.queries)], args.noise, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = {
+            "size":      args.size,
+            "queries":   args.queries,
+            "data":      "real" if args.real else "synthetic",
+            "faq_index": bench_faq(vecs, queries),
+            "retrieval": bench_retrieval(vecs, queries, args.k, tmp),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
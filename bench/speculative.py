@@ -0,0 +1,97 @@
+"""
+Speculative vs plain decoding on RAG-shaped prompts.
+
+Builds the same prompt the chatbot sends (prompt prefix, fixture KB
+chunks as context, a question) and generates greedily with each mode,
+one engine at a time.  Reports decode tokens/s, time to first token and,
+for the speculative modes, the draft acceptance rate.  Needs the GGUF
+model (MODEL_PATH / app.config.MODEL_PATH); "draft" also needs
+LLM_DRAFT_MODEL.
+
+    python bench/speculative.py --modes off prompt_lookup --prompts 10
+"""
+
+import os, sys, json, time, argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fakes import fixture_chunks
+from components import QUESTIONS
+from app.prompts import PROMPT_PREFIX
+
+
+def rag_prompts(n, chunks_per_prompt=4):
+    chunks = fixture_chunks()
+    prompts = []
+    for i in range(n):
+        context = "\n".join(chunks[(i + j) % len(chunks)] for j in range(chunks_per_prompt))
+        prompts.append(f"{PROMPT_PREFIX}{context}\n\nUser: {QUESTIONS[i % len(QUESTIONS)]}\nAssistant:\n")
+    return prompts
+
+
+def run(mode, prompts, max_tokens, n_ctx, n_threads, draft_tokens):
+    from app.llm import _abs
+    from app.config import MODEL_PATH
+    from app.llm.llama_cpp import LlamaCppEngine, make_draft_model
+
+    draft_path = os.getenv("LLM_DRAFT_MODEL")
+    engine = LlamaCppEngine(
+        model_path=_abs(os.getenv("MODEL_PATH", MODEL_PATH)),
+        n_ctx=n_ctx,
+        n_threads=n_threads,
+        draft_model=make_draft_model(mode, n_ctx, n_threads,
+                                     draft_model_path=_abs(draft_path) if draft_path else None,
+                                     num_pred_tokens=draft_tokens),
+    )
+    tokens = decode_s = 0.0
+    ttft = []
+    for prompt in prompts:
+        start, first, text = time.perf_counter(), None, []
+        for tok in engine.stream(prompt, max_tokens=max_tokens, temperature=0.0,
+                                 stop=["User:", "Assistant:"]):
+            if first is None:
+                first = time.perf_counter()
+            text.append(tok)
+        if first is None:
+            continue
+        ttft.append(first - start)
+        decode_s += time.perf_counter() - first
+        # same tokenizer for every mode, so tokens/s compare across modes
+        tokens += engine.count_tokens("".join(text))
+
+    ttft.sort()
+    result = {
+        "prompts":       len(prompts),
+        "tokens":        int(tokens),
+        "tokens_per_s":  round(tokens / decode_s, 1) if decode_s else None,
+        "ttft_p50_ms":   round(ttft[len(ttft) // 2] * 1000, 1) if ttft else None,
+    }
+    spec = engine.spec_stats()
+    if spec:
+        result["acceptance_rate"] = spec["acceptance_rate"]
+        result["draft_calls"]     = spec["draft_calls"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["off", "prompt_lookup"],
+                        choices=["off", "prompt_lookup", "draft"])
+    parser.add_argument("--prompts", type=int, default=10)
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--n-ctx", type=int, default=int(os.getenv("LLM_N_CTX", 2048)))
+    parser.add_argument("--threads", type=int, default=int(os.getenv("LLM_THREADS", 4)))
+    parser.add_argument("--draft-tokens", type=int, default=int(os.getenv("LLM_DRAFT_TOKENS", 10)))
+    args = parser.parse_args()
+
+    prompts = rag_prompts(args.prompts)
+    report  = {mode: run(mode, prompts, args.max_tokens, args.n_ctx, args.threads, args.draft_tokens)
+               for mode in args.modes}
+    base = report.get("off", {}).get("tokens_per_s")
+    for mode, result in report.items():
+        if base and result["tokens_per_s"]:
+            result["speedup"] = round(result["tokens_per_s"] / base, 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Import / start-up time of each entry point, in fresh interpreters.
+
+Reports the median wall time per entry point and which heavy libraries
+were imported along the way (they should appear only after warmup):
+
+    python bench/startup.py --runs 5
+"""
+
+import os, sys, json, time, argparse, subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ["llama_cpp", "sentence_transformers", "torch", "chromadb", "sklearn", "gradio"]
+
+# name -> statement run in a fresh interpreter from the project root
+ENTRY_POINTS = {
+    "import app.chatbot":     "import app.chatbot",
+    "import app.retrieval":   "import app.retrieval",
+    "import app.server":      "import app.server",
+    "email_agent --help":     "import runpy; sys.argv = ['email_agent', '--help']; "
+                              "runpy.run_path('app/email_agent.py', run_name='__main__')",
+    "refresh_kb --help":      "import runpy; sys.argv = ['refresh_kb', '--help']; "
+                              "runpy.run_path('scripts/refresh_kb.py', run_name='__main__')",
+}
+
+PROBE = """
+import sys, json, time
+start = time.perf_counter()
+try:
+    {stmt}
+except SystemExit:
+    pass
+elapsed = time.perf_counter() - start
+print("\\n" + json.dumps({{"s": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(stmt):
+    code = PROBE.format(stmt=stmt, heavy=HEAVY)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT,
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {"wall_s": wall, "import_s": result["s"], "heavy": result["heavy"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    report = {}
+    for name, stmt in ENTRY_POINTS.items():
+        samples = [measure(stmt) for _ in range(args.runs)]
+        errors  = [s["error"] for s in samples if "error" in s]
+        if errors:
+            report[name] = {"error": errors[0]}
+            continue
+        walls   = sorted(s["wall_s"] for s in samples)
+        imports = sorted(s["import_s"] for s in samples)
+        report[name] = {
+            "median_wall_ms":   round(walls[len(walls) // 2] * 1000, 1),
+            "median_import_ms": round(imports[len(imports) // 2] * 1000, 1),
+            "heavy_imports":    samples[-1]["heavy"],
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
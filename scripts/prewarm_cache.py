@@ -0,0 +1,132 @@
+"""
+Pre-warm the response cache from the question log.
+
+Logged questions (data/questions_log.json) are clustered by embedding at
+the FAQ match threshold, so every member of a cluster would be served by
+a cached answer to its representative, the most frequently asked
+phrasing.  Representatives of the largest clusters the cache does not
+already cover are answered through the normal RAG path and stored in the
+FAQ cache.  Meant to run off-peak, e.g. nightly from cron:
+
+    python scripts/prewarm_cache.py --top 50 --days 30
+
+The projected hit rate replays the logged questions against the cache
+before and after the run.  A running chat server picks the new entries
+up on its next start.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.response_cache import cache_key
+
+
+def logged_questions(log, days=0):
+    """Counter of cache keys asked in the last *days* (0 = whole log)."""
+    cutoff = time.time() - days * 86400 if days else None
+    counts = Counter()
+    for entry in log:
+        key = cache_key(entry.get("question", ""))
+        if not key:
+            continue
+        if cutoff is not None:
+            try:
+                asked = time.mktime(time.strptime(entry.get("timestamp", ""), "%Y-%m-%d %H:%M:%S"))
+            except ValueError:
+                continue
+            if asked < cutoff:
+                continue
+        counts[key] += 1
+    return counts
+
+def served(keys, vecs, cached_keys, cached_vecs, threshold):
+    """Per question: would the exact or the semantic tier answer it?"""
+    hit = np.array([k in cached_keys for k in keys], dtype=bool)
+    if len(cached_vecs):
+        hit |= (vecs @ np.asarray(cached_vecs, dtype=np.float32).T).max(axis=1) >= threshold
+    return hit
+
+def main():
+    # imported here so --help does not load the models
+    from app import chatbot, resources
+    from app.embeddings import cluster_vectors
+
+    parser = argparse.ArgumentParser(description="Answer the most asked questions ahead of time.")
+    parser.add_argument("--top", type=int, default=50, help="clusters to answer per run")
+    parser.add_argument("--days", type=int, default=30, help="only questions from the last N days (0 = all)")
+    parser.add_argument("--min-count", type=int, default=2,
+                        help="skip clusters asked fewer times than this")
+    parser.add_argument("--threshold", type=float, default=chatbot.FAQ_THRESHOLD,
+                        help="cluster similarity (defaults to the FAQ match threshold)")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be generated")
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    counts = logged_questions(chatbot.question_log, args.days)
+    if not counts:
+        print("No logged questions to pre-warm from.")
+        return
+
+    # most asked first, so each cluster is led by its most common phrasing
+    keys    = [k for k, _ in counts.most_common()]
+    weights = np.array([counts[k] for k in keys])
+    vecs    = resources.get("embedder").encode(keys)
+    index   = resources.get("faq_index")
+    before  = served(keys, vecs, set(chatbot.response_cache), index.matrix, args.threshold)
+
+    clusters = sorted(cluster_vectors(vecs, args.threshold), key=lambda idx: -weights[idx].sum())
+    picked   = [idx for idx in clusters
+                if weights[idx].sum() >= args.min_count and not before[idx[0]]][:args.top]
+    print(f"{int(weights.sum())} logged questions, {len(keys)} distinct, {len(clusters)} clusters; "
+          f"answering {len(picked)}.")
+
+    generated, failed = [], []
+    started = time.time()
+    for idx in picked:
+        question = keys[idx[0]]
+        if args.dry_run:
+            generated.append(question)
+            continue
+        # the normal RAG path caches the answer with its sources and KB version
+        "".join(chatbot.generate_response(question, log_question=False))
+        (generated if question in chatbot.response_cache else failed).append(question)
+    elapsed = time.time() - started
+
+    if args.dry_run:
+        rows   = [keys.index(q) for q in generated]
+        cached = np.vstack([index.matrix, vecs[rows]]) if rows else index.matrix
+        after  = served(keys, vecs, set(chatbot.response_cache) | set(generated), cached, args.threshold)
+    else:
+        chatbot.save_data()
+        after  = served(keys, vecs, set(chatbot.response_cache), index.matrix, args.threshold)
+
+    total  = weights.sum()
+    report = {
+        "questions":       int(total),
+        "distinct":        len(keys),
+        "clusters":        len(clusters),
+        "generated":       len(generated),
+        "failed":          failed,
+        "seconds":         round(elapsed, 1),
+        "dry_run":         args.dry_run,
+        "hit_rate_before": round(float(weights[before].sum() / total), 4),
+        "hit_rate_after":  round(float(weights[after].sum() / total), 4),
+        "top_clusters":    [{"question": keys[idx[0]], "asked": int(weights[idx].sum()),
+                             "variants": len(idx), "cached": bool(after[idx[0]])}
+                            for idx in clusters[:args.top]],
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,19 @@
 import os
 import sys
 import json
+import hashlib
+import argparse
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.scraper import get_all_site_content, SITE_URL 
-from app.retrieval import update_vector_store, query_vector_store
+from app.crawler import Crawler, is_gone
 from app.config import VECTOR_COLLECTION
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 os.makedirs(DATA_DIR, exist_ok=True)
+MANIFEST_FILE = os.path.join(DATA_DIR, "kb_manifest.json")
+WEBSITE_DATA_FILE = os.path.join(DATA_DIR, "website_data.json")
 
 def merge_section_lines(section_data, min_chars=250):
     merged = []
@@ -27,29 +31,108 @@ def merge_section_lines(section_data, min_chars=250):
             merged.append(buffer.strip())
     return merged
 
-if __name__ == "__main__":
+def _hash(obj):
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, ensure_ascii=False)
+                        .encode("utf-8")).hexdigest()
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"pages": {}, "chunks": {}}
+
+def save_manifest(manifest):
+    tmp = MANIFEST_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, MANIFEST_FILE)
+
+def load_previous_pages():
+    """Pages of the last successful run (website_data.json), by url."""
+    try:
+        with open(WEBSITE_DATA_FILE, encoding="utf-8") as f:
+            return {p["url"]: p for p in json.load(f)}
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def diff_chunks(old, new):
+    """Counts of chunk keys (url#position) added, changed and removed."""
+    added   = sum(1 for k in new if k not in old)
+    changed = sum(1 for k in new if k in old and old[k] != new[k])
+    removed = sum(1 for k in old if k not in new)
+    return added, changed, removed
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape the site and rebuild the knowledge base.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip the rebuild when no page changed since the last run")
+    args = parser.parse_args()
+
     print("Refreshing knowledge base...")
-    page_data, subpages = get_all_site_content(SITE_URL)
+    crawler = Crawler()
+    page_data, subpages = get_all_site_content(SITE_URL, crawler=crawler)
+    if not page_data:
+        # site down or blocked: an empty crawl must not retire every chunk
+        sys.exit("No pages could be fetched; knowledge base left unchanged.")
+
+    manifest = load_manifest()
+    pages = {p.get("source_url", ""): _hash(p.get("sections", {})) for p in page_data}
+
+    # a page that failed this time keeps its previous sections unless the
+    # site says it is gone (404 / 410)
+    previous = load_previous_pages()
+    kept = [previous[url] for url, error in crawler.failed.items()
+            if url in previous and not is_gone(error)]
+    for page in kept:
+        pages[page["url"]] = manifest["pages"].get(page["url"], "")
+    if kept:
+        print(f"Keeping the previous content of {len(kept)} page(s) that failed: "
+              f"{', '.join(p['url'] for p in kept)}")
+
+    if args.incremental and pages == manifest["pages"]:
+        print("Knowledge base unchanged; nothing to do.")
+        return
 
     structured_pages = []
     flattened_sections = []
+    chunks = {}
 
-    for page in page_data:
-        sections = merge_section_lines(page.get("sections", {}))
+    fetched = [(p.get("source_url", ""), p.get("title", ""), merge_section_lines(p.get("sections", {})))
+               for p in page_data]
+    for url, title, sections in fetched + [(p["url"], p["title"], p["sections"]) for p in kept]:
         structured_pages.append({
-            "url": page.get("source_url", ""),
-            "title": page.get("title", ""),
+            "url": url,
+            "title": title,
             "sections": sections
         })
         flattened_sections.extend(sections)
+        chunks.update({f"{url}#{i}": _hash(text) for i, text in enumerate(sections)})
 
-    update_vector_store(VECTOR_COLLECTION, flattened_sections)
+    # imported here so an unchanged --incremental run never loads the embedder
+    from app.retrieval import update_vector_store, query_vector_store
+    from app.vectorstores import doc_id
+    from app.kb_state import record_refresh
 
-    with open(os.path.join(DATA_DIR, "website_data.json"), "w", encoding="utf-8") as f:
+    # content-hash ids: only chunks not already in the index get embedded
+    stats = update_vector_store(VECTOR_COLLECTION, flattened_sections)
+    # new KB version: cached answers built on removed chunks are dropped
+    version, gone = record_refresh(doc_id(text) for text in flattened_sections)
+
+    with open(WEBSITE_DATA_FILE, "w", encoding="utf-8") as f:
         json.dump(structured_pages, f, indent=2, ensure_ascii=False)
+    save_manifest({"pages": pages, "chunks": chunks})
+
+    added, changed, removed = diff_chunks(manifest["chunks"], chunks)
+    print(f"Knowledge base refreshed. {len(flattened_sections)} sections, "
+          f"{added} added, {changed} changed, {removed} removed "
+          f"({stats['added']} embedded). KB version {version}, "
+          f"{len(gone)} chunk ids retired.")
 
-    print(f"Knowledge base refreshed. {len(flattened_sections)} sections embedded.")
+    if not args.incremental:
+        query = "Where is NileEdge located?"
+        result = query_vector_store(query, VECTOR_COLLECTION)
+        print(result)
 
-    query = "Where is NileEdge located?"
-    result = query_vector_store(query, VECTOR_COLLECTION)
-    print(result)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import sys, json, threading
+
+import numpy as np
+
+from app import resources
+from app.faq_index import FaqIndex
+from app.kb_state import KbState, record_refresh
+from app.response_cache import ResponseCache
+from app.storage import Journal
+
+DIM = 8
+
+
+def _vec(i):
+    return np.random.default_rng(i).standard_normal(DIM).astype(np.float32)
+
+
+def _cache(tmp_path, entries=None, limit=100, name="test_faq_index"):
+    path = tmp_path / "faq_cache.json"
+    if entries is not None:
+        path.write_text(json.dumps(entries), encoding="utf-8")
+    index = FaqIndex(dim=DIM)
+    resources.override(name, index)
+    cache = ResponseCache(Journal(path, "dict"), limit, threshold=0.9,
+                          kb_state=KbState(tmp_path / "kb_state.json"), index=name)
+    for i, key in enumerate(cache):
+        index.add(key, _vec(i))
+    return cache, index
+
+
+def test_legacy_entries_survive_invalidation(tmp_path):
+    record_refresh(["a", "b"], tmp_path / "kb_state.json")
+    legacy = {"What services do you offer?": {"answer": "AI and training.",
+                                              "timestamp": "2025-05-24 00:00:00"}}
+    cache, index = _cache(tmp_path, legacy)
+    cache.put("uses a", "from a", _vec(10), sources=["a"])
+    cache.put("uses b", "from b", _vec(11), sources=["b"])
+
+    version, removed = record_refresh(["b", "c"], tmp_path / "kb_state.json")
+    assert removed == ["a"]
+    assert cache.kb_version() == version                  # picks up the refresh and invalidates
+
+    assert set(cache) == {"What services do you offer?", "uses b"}
+    assert set(index.keys) == set(cache)
+    assert cache.lookup("What services do you offer?") == "AI and training."
+
+
+def test_concurrent_puts_lookups_and_invalidations(tmp_path):
+    record_refresh(["a"], tmp_path / "kb_state.json")
+    cache, index = _cache(tmp_path, limit=20, name="test_faq_index_threads")
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(2000):
+                key = f"q{(n * 7 + i) % 40}"
+                cache.put(key, "answer", _vec(i), sources=["a"])
+                cache.lookup(f"q{i % 40}")
+                if i % 50 == 0:
+                    cache.invalidate(f"v{n}-{i}")
+                if i % 11 == 0:
+                    cache.delete(key)
+                list(cache)
+        except Exception as e:
+            errors.append(e)
+
+    switch = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(switch)
+
+    assert not errors, errors
+    assert len(cache) <= 20
+    assert set(index.keys) == set(cache)